@@ -0,0 +1,82 @@
+"""Análisis contrafactuales sobre las alineaciones
+
+WhatIf reordena la tabla larga de picks en tensores managers × gameweeks ×
+15 (una capa por posición de la alineación), alineados con las matrices
+del LeagueCube, y calcula con operaciones de NumPy, sin bucles por manager,
+cuántos puntos se perdieron en cada jornada por:
+
+- la elección de capitán: el mejor titular con el brazalete frente al
+  elegido;
+- el orden del banquillo: los suplentes de campo que entraron por titulares
+  sin minutos frente a los mejores que podrían haber entrado.
+
+Los resultados son matrices managers × gameweeks que se filtran con las
+mismas vistas del cubo.
+"""
+import numpy as np
+import pandas as pd
+
+SQUAD_SIZE = 15
+STARTERS = 11
+FIRST_OUTFIELD_SUB = 12  # Índice (base 0) del primer suplente de campo
+
+def picks_tensor(picks, manager_ids, gameweeks, values, dtype, fill=0):
+    """Valores por pick como tensor (managers, gameweeks, 15), indexado
+    igual que las matrices del cubo y por position - 1"""
+    rows = pd.Index(manager_ids).get_indexer(picks['manager_id'])
+    cols = np.searchsorted(gameweeks, picks['gameweek'].to_numpy())
+    slots = picks['position'].to_numpy().astype(np.intp) - 1
+    valid = (rows >= 0) & (cols < len(gameweeks)) & (slots >= 0) & (slots < SQUAD_SIZE)
+    valid[valid] = gameweeks[cols[valid]] == picks['gameweek'].to_numpy()[valid]
+    tensor = np.full((len(manager_ids), len(gameweeks), SQUAD_SIZE), fill, dtype=dtype)
+    tensor[rows[valid], cols[valid], slots[valid]] = np.asarray(values)[valid]
+    return tensor
+
+class WhatIf:
+    """Puntos perdidos por capitán y por orden del banquillo de una liga"""
+    def __init__(self, picks, manager_ids, gameweeks):
+        def tensor(values, dtype, fill=0):
+            return picks_tensor(picks, manager_ids, gameweeks, values, dtype, fill)
+
+        points = tensor(picks['player_points'].to_numpy(), np.int32)
+        minutes = tensor(picks['minutes'].to_numpy(), np.int16)
+        multiplier = tensor(picks['multiplier'].to_numpy(), np.int8)
+        goalkeeper = tensor((picks['player_position'] == 'GKP').to_numpy(), bool)
+
+        # Capitán: el multiplicador extra (x2 o x3 con triple capitán) lo
+        # recibe quien tenga el mayor multiplicador entre los titulares
+        starters = points[..., :STARTERS]
+        armband = multiplier[..., :STARTERS]
+        chosen = np.take_along_axis(starters, armband.argmax(axis=2)[..., None], axis=2)[..., 0]
+        extra = np.maximum(armband.max(axis=2).astype(np.int32) - 1, 0)
+        self.captain_points = chosen * extra
+        self.best_captain_points = starters.max(axis=2) * extra
+        self.captain_lost = self.best_captain_points - self.captain_points
+
+        # Banquillo: por cada titular de campo sin minutos entra el siguiente
+        # suplente de campo que haya jugado, en el orden elegido. Se ignoran
+        # las restricciones de formación, así que es una cota del efecto del
+        # orden; solo tiene sentido en jornadas terminadas.
+        bench = points[..., FIRST_OUTFIELD_SUB:]
+        played = minutes[..., FIRST_OUTFIELD_SUB:] > 0
+        missing = ((minutes[..., :STARTERS] == 0) & ~goalkeeper[..., :STARTERS]).sum(axis=2)
+        order = np.cumsum(played, axis=2)
+        came_on = played & (order <= missing[..., None])
+        self.bench_points = (bench * came_on).sum(axis=2)
+        # Mejor orden posible: los suplentes que jugaron, de más a menos puntos
+        floor = np.iinfo(np.int32).min
+        ranked = -np.sort(-np.where(played, bench, floor).astype(np.int64), axis=2)
+        best = (np.arange(bench.shape[2]) < missing[..., None]) & (ranked > floor)
+        self.best_bench_points = np.where(best, ranked, 0).sum(axis=2).astype(np.int32)
+        self.bench_order_lost = self.best_bench_points - self.bench_points
+
+    def summary(self, view):
+        """Puntos perdidos por equipo en una vista del cubo, de más a menos"""
+        captain = view.sum(self.captain_lost)
+        bench = view.sum(self.bench_order_lost)
+        return pd.DataFrame({
+            'team_name': view.team_names,
+            'captain_lost': captain,
+            'bench_order_lost': bench,
+            'total_lost': captain + bench,
+        }).sort_values(['total_lost', 'team_name'], ascending=[False, True], ignore_index=True)
@@ -1,193 +1,309 @@
 import pandas as pd
 import streamlit as st
-import plotly.express as px 
-import plotly.graph_objects as go
 import numpy as np
-import requests
-import time
+import os
 from datetime import datetime
-
-class FPLData:
-    def __init__(self):
-        self.session = requests.session()
-        self.base_url = "https://fantasy.premierleague.com/api/"
-        self.general_data = None
-
-    # Primero, añadamos un método para obtener el nombre de la liga
-    def get_league_info(self,league_id):
-        """Obtiene información básica de la liga"""
-        url = f"{self.base_url}leagues-classic/{league_id}/"
-        r = self.session.get(url)
-        return r.json()
-
-    def gln(self,lid):
-        return self.get_league_info(lid)['name']
-    '''
-    def get_league_name(self, league_id):
-        """Obtiene nombre de la liga"""
-        league_info = 
-        return league_info['name']
-    '''
-    def get_general_data(self):
-        """Obtiene datos generales de la FPL"""
-        if not self.general_data:
-            url = f"{self.base_url}bootstrap-static/"
-            r = self.session.get(url)
-            self.general_data = r.json()
-        return self.general_data
-    
-    def get_league_standings(self, league_id, page=1):
-        """Obtiene la clasificación de una liga"""
-        url = f"{self.base_url}leagues-classic/{league_id}/standings/?page_standings={page}"
-        r = self.session.get(url)
-        return r.json()
-    
-    def get_manager_history(self, team_id):
-        """Obtiene el historial de un manager"""
-        url = f"{self.base_url}entry/{team_id}/history/"
-        r = self.session.get(url)
-        return r.json()
-    
-    def get_team_picks(self, team_id, gameweek):
-        """Obtiene las selecciones de un equipo para una gameweek"""
-        url = f"{self.base_url}entry/{team_id}/event/{gameweek}/picks/"
-        r = self.session.get(url)
-        return r.json()
-    
-    def get_player_details(self, player_id):
-        """Obtiene detalles de un jugador"""
-        url = f"{self.base_url}element-summary/{player_id}/"
-        r = self.session.get(url)
-        return r.json()
-   
-    # Y modifiquemos el process_league_data para incluir más detalles
-    def process_league_data(self, league_id):
-        # Obtener datos generales
-        general_data = self.get_general_data()
-        players_df = pd.DataFrame(general_data['elements'])
-        teams_df = pd.DataFrame(general_data['teams'])
-        events_df = pd.DataFrame(general_data['events'])
-        
-        # Obtener datos de la liga
-        league_data = self.get_league_standings(league_id)
-        league_info = self.get_league_info(league_id)
-        
-        if not league_data or 'standings' not in league_data:
-            st.error("No se pudieron obtener los datos de la liga")
-            return None
-            
-        # Procesar managers y sus equipos
-        managers_data = []
-        managers_summary = []
-        current_event = events_df[events_df['is_current']].iloc[0]['id'] if not events_df[events_df['is_current']].empty else events_df['id'].max()
-        
-        with st.spinner('Cargando datos de los equipos...'):
-            progress_bar = st.progress(0)
-            
-            for i, entry in enumerate(league_data['standings']['results']):
-                team_id = entry['entry']
-                try:
-                    # Obtener historial del equipo
-                    history = self.get_manager_history(team_id)
-                    if history and 'current' in history:
-                        wildcards_used = []
-                        chips_used = history.get('chips', [])
-                        for chip in chips_used:
-                            if chip['name'] == 'wildcard':
-                                wildcards_used.append(chip['event'])
-                        
-                        for gw in history['current']:
-                            gw_data = {
-                                'manager_id': team_id,
-                                'manager_name': entry['player_name'],
-                                'team_name': entry['entry_name'],
-                                'gameweek': gw['event'],
-                                'total_points': gw['total_points'],
-                                'gameweek_points': gw['points'],
-                                'transfers': gw['event_transfers'],
-                                'transfer_cost': gw['event_transfers_cost'],
-                                'bank': gw['bank'],
-                                'team_value': gw['value'],
-                                'wildcard_used': gw['event'] in wildcards_used,
-                                'overall_rank': gw['overall_rank'],
-                                'rank': gw['rank']
-                            }
-                            
-                            # Obtener alineación para esta gameweek
-                            picks_data = self.get_team_picks(team_id, gw['event'])
-                            if picks_data and 'picks' in picks_data:
-                                squad_data = []
-                                for pick in picks_data['picks']:
-                                    player_info = players_df[players_df['id'] == pick['element']].iloc[0]
-                                    team_info = teams_df[teams_df['id'] == player_info['team']].iloc[0]
-                                    
-                                    squad_data.append({
-                                        'player_id': pick['element'],
-                                        'player_name': f"{player_info['first_name']} {player_info['second_name']}",
-                                        'player_team': team_info['name'],
-                                        'position': pick['position'],
-                                        'is_captain': pick['is_captain'],
-                                        'is_vice_captain': pick['is_vice_captain'],
-                                        'multiplier': pick['multiplier']
-                                    })
-                                
-                                gw_data['squad'] = squad_data
-                            
-                            managers_data.append(gw_data)
-                    
-                    time.sleep(0.5)  # Respetar rate limits
-                    progress_bar.progress((i + 1) / len(league_data['standings']['results']))
-                    
-                except Exception as e:
-                    st.warning(f"Error obteniendo datos para el equipo {team_id}: {str(e)}")
-                    continue
-        
-        df = pd.DataFrame(managers_data)
-        
-        return df
+from fpl_data import FPLData
+from refresher import LeagueRefresher
+from cube import LeagueCube
+# charts (plotly), analytics y simulation se importan donde se usan: la
+# cabecera se pinta sin esperar a cargarlos
+from offline import OFFLINE_LEAGUE, OFFLINE_NAME, offline_snapshot
 
 # Configuración de la página
 st.set_page_config(page_title="Fantasy Premier League Analytics", layout="wide")
 
 # Inicializar clase de datos
+MAX_WORKERS = 8            # Peticiones simultáneas a la API
+REQUESTS_PER_SECOND = 10   # Rate limit compartido entre hilos
+CACHE_PATH = os.environ.get("FPL_CACHE_PATH", ".fpl_cache/http.sqlite")
+SNAPSHOT_DIR = os.environ.get("FPL_SNAPSHOT_DIR", ".fpl_cache/snapshots")
+
 @st.cache_resource
 def get_fpl_data():
-    return FPLData()
+    return FPLData(
+        max_workers=MAX_WORKERS,
+        requests_per_second=REQUESTS_PER_SECOND,
+        cache_path=CACHE_PATH
+    )
 
 fpl = get_fpl_data()
 
-# Cargar datos
-LEAGUE_ID = "1126029"
+# Cargar datos: ligas separadas por comas; la primera es la predeterminada.
+# "offline" añade la liga cargada a mano (sin API)
+LEAGUE_IDS = os.environ.get("FPL_LEAGUE_IDS", "1126029").split(",")
+ONLINE_LEAGUE_IDS = [league_id for league_id in LEAGUE_IDS if league_id != OFFLINE_LEAGUE]
+LEAGUE_NAMES = {"1126029": "Mulas", OFFLINE_LEAGUE: OFFLINE_NAME}
+
+def load_league_name(league_id):
+    # Sin red: el nombre llega con la clasificación que descarga el
+    # refresher y se guarda con el snapshot
+    if league_id in LEAGUE_NAMES:
+        return LEAGUE_NAMES[league_id]
+    snapshot = refresher.latest(league_id) if refresher is not None else None
+    if snapshot is not None and snapshot.name:
+        return snapshot.name
+    return f"Liga {league_id}"
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
-def load_league_name():
-    return fpl.gln(LEAGUE_ID)
 
+REFRESH_INTERVAL = 3600  # Segundos entre refrescos en segundo plano
+LIVE_INTERVAL = int(os.environ.get("FPL_LIVE_INTERVAL", "60"))  # Segundos entre actualizaciones en vivo
+SIM_PROCESSES = int(os.environ.get("FPL_SIM_PROCESSES", "1"))  # Procesos del simulador
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
-def load_league_data():
-    return fpl.process_league_data(LEAGUE_ID)
+@st.cache_resource
+def get_refresher():
+    # Un único hilo por proceso para todas las ligas, compartido por todas
+    # las sesiones; tras la primera carga solo descarga las gameweeks nuevas
+    refresher = LeagueRefresher(
+        fpl, ONLINE_LEAGUE_IDS, interval=REFRESH_INTERVAL, snapshot_dir=SNAPSHOT_DIR,
+        live_interval=LIVE_INTERVAL
+    )
+    # Los snapshots en disco se abren con memory-map: publicarlos antes de
+    # arrancar el hilo permite pintar la página sin esperar a la red
+    refresher.load_persisted()
+    refresher.start()
+    return refresher
 
-# Cargar datos
-df = load_league_data()
+@st.cache_resource
+def get_offline_snapshot():
+    return offline_snapshot()
 
-league_name = "Mulas" #'load_league_name()'
+refresher = get_refresher() if ONLINE_LEAGUE_IDS else None
 
-# En la sección principal
-st.title(f'🏆 {league_name}')
-st.markdown(f"""
-### Liga: {league_name }
-Temporada 2023/24 • {len(df['team_name'].unique())} equipos
+# Selector de liga (solo si hay varias)
+if len(LEAGUE_IDS) > 1:
+    league_id = st.sidebar.selectbox('Liga', LEAGUE_IDS, format_func=load_league_name)
+else:
+    league_id = LEAGUE_IDS[0]
+
+# Cargar datos: tabla manager-gameweek y tabla larga de alineaciones. El
+# snapshot guardado en disco ya está publicado al arrancar, así que solo se
+# espera a la red si la liga no tiene ninguno
+if league_id == OFFLINE_LEAGUE:
+    snapshot = get_offline_snapshot()
+else:
+    snapshot = refresher.latest(league_id)
+df, picks_df = (snapshot.df, snapshot.picks) if snapshot is not None else (None, None)
+
+league_name = load_league_name(league_id)
+
+# En la sección principal: la cabecera se pinta antes de esperar a los datos
+title = st.empty()
+title.title(f'🏆 {league_name}')
+header = st.empty()
+intro = st.empty()
+intro.markdown(f"""
+Este dashboard muestra estadísticas detalladas de {league_name} de Fantasy Premier League.
 """)
-st.markdown(f"""
+
+if snapshot is None and refresher is not None and not refresher.first_attempt.is_set():
+    with st.spinner('Cargando datos de los equipos...'):
+        progress_bar = st.progress(0)
+        while not refresher.first_attempt.wait(0.5):
+            progress_bar.progress(refresher.progress)
+        progress_bar.empty()
+    snapshot = refresher.latest(league_id)
+    df, picks_df = (snapshot.df, snapshot.picks) if snapshot is not None else (None, None)
+    # El nombre de la liga llega con la primera clasificación
+    if load_league_name(league_id) != league_name:
+        league_name = load_league_name(league_id)
+        title.title(f'🏆 {league_name}')
+        intro.markdown(f"""
 Este dashboard muestra estadísticas detalladas de {league_name} de Fantasy Premier League.
 """)
 
+header.markdown(f"""
+### Liga: {league_name }
+Temporada 2023/24 • {df['team_name'].nunique() if df is not None else 0} equipos
+""")
+
+# Modo en vivo: con una gameweek en juego el refresher publica los puntos
+# provisionales cada LIVE_INTERVAL segundos, y este fragmento vuelve a
+# ejecutar la página cuando hay un snapshot nuevo
+@st.fragment(run_every=LIVE_INTERVAL)
+def live_watch(league_id, version, gameweek):
+    latest = refresher.latest(league_id)
+    if latest is not None and latest.version != version:
+        st.rerun()
+    st.caption(
+        f"🔴 GW{gameweek} en vivo: puntos provisionales, "
+        f"actualizados a las {datetime.fromtimestamp(snapshot.built_at).strftime('%H:%M:%S')}"
+    )
+
+# La gameweek en juego la consulta el refresher: la página no espera a la red
+if snapshot is not None and league_id != OFFLINE_LEAGUE:
+    live_gameweek = refresher.live_gameweek
+    if live_gameweek is not None and st.sidebar.toggle('Modo en vivo', value=True):
+        with st.sidebar:
+            live_watch(league_id, snapshot.version, live_gameweek)
+
+@st.cache_resource(max_entries=2 * len(LEAGUE_IDS))
+def get_cube(league_id, version, _df):
+    # Agregados precomputados una vez por snapshot
+    return LeagueCube(_df)
+
+@st.cache_resource(max_entries=2 * len(LEAGUE_IDS))
+def get_whatif(league_id, version, _picks, _cube):
+    # Contrafactuales de capitán y banquillo, una vez por snapshot
+    from analytics import WhatIf
+    return WhatIf(_picks, _cube.manager_ids, _cube.gameweeks)
+
+@st.cache_resource(max_entries=2 * len(LEAGUE_IDS))
+def get_ownership(league_id, version, _picks, _cube):
+    # Matrices dispersas de picks, una vez por snapshot
+    from ownership import Ownership
+    return Ownership(_picks, _cube.manager_ids, _cube.gameweeks)
+
+@st.cache_resource(max_entries=2 * len(LEAGUE_IDS))
+def get_transfer_log(league_id, version, _transfers, _cube):
+    # Registro de transferencias indexado, una vez por snapshot
+    from transfers import TransferLog
+    return TransferLog(_transfers, _cube.manager_ids, _cube.gameweeks)
+
+@st.cache_data(max_entries=2 * len(LEAGUE_IDS))
+def get_player_points(league_id, version, gameweeks):
+    # Puntos de todos los jugadores (live de cada jornada, desde la caché)
+    return fpl.get_player_points(gameweeks)
+
+@st.cache_data(max_entries=8)
+def simulate_season(league_id, version, seasons, relegation_spots, _cube):
+    # Misma semilla por snapshot: recargar la página no cambia la proyección
+    from simulation import SeasonSimulator
+    simulator = SeasonSimulator(_cube)
+    return simulator.run(seasons, relegation_spots, seed=version, processes=SIM_PROCESSES)
+
+# Datos y figuras de cada sección, memoizados por liga, versión del
+# snapshot y filtros: mover un filtro solo reconstruye lo que depende de él
+@st.cache_data(max_entries=32)
+def performance_figures(league_id, version, gw_range, managers, _cube):
+    import charts
+    view = _cube.select(gw_range, managers)
+    return charts.points_figure(view.points()), charts.positions_figure(view.positions())
+
+@st.cache_data(max_entries=8)
+def cumulative_figure(league_id, version, _cube):
+    import charts
+    return charts.cumulative_figure(_cube.cumulative_positions())
+
+@st.cache_data(max_entries=32)
+def team_figures(league_id, version, gw_range, managers, _cube):
+    import charts
+    view = _cube.select(gw_range, managers)
+    totals = view.totals()
+    return (
+        charts.box_figure(view.points()),
+        charts.totals_figure(totals, 'transfers', 'Total de Transferencias'),
+        charts.totals_figure(totals, 'transfer_cost', 'Costo Total de Transferencias'),
+    )
+
+@st.cache_data(max_entries=8)
+def league_figures(league_id, version, _cube, _picks):
+    import charts
+    # Puntos reales del jugador en las jornadas en que fue elegido
+    top_players = _picks.groupby('player_name', observed=True).agg({
+        'is_captain': 'sum',
+        'player_points': 'mean',
+        'player_team': 'first'
+    }).sort_values('player_points', ascending=False).reset_index()
+    large = len(_cube.team_names) > charts.LARGE_LEAGUE
+    return charts.wildcards_figure(_cube.wildcards(), large), charts.players_figure(top_players.head(15))
+
+@st.cache_data(max_entries=32)
+def captain_section(league_id, version, gw_range, managers, _cube, _picks):
+    import charts
+    view = _cube.select(gw_range, managers)
+    captain_picks = _picks[_picks['is_captain']].merge(
+        view.keys(),
+        on=['manager_id', 'gameweek']
+    )
+    captains_df = captain_picks.groupby(['player_name', 'player_team'], observed=True).size().reset_index(name='times_captain')
+    captains_df = captains_df.sort_values('times_captain', ascending=False)
+    captain_details = captain_picks.pivot_table(
+        index='gameweek',
+        columns='team_name',
+        values='player_name',
+        aggfunc='first',
+        observed=True
+    )
+    whatif = get_whatif(league_id, version, _picks, _cube)
+    return (
+        charts.captains_figure(captains_df.head(10)),
+        charts.lost_figure(whatif.summary(view).head(20)),
+        captain_details,
+    )
+
+@st.cache_data(max_entries=32)
+def ownership_section(league_id, version, gw_range, managers, _cube, _picks):
+    import charts
+    view = _cube.select(gw_range, managers)
+    ownership = get_ownership(league_id, version, _picks, _cube)
+    eo = ownership.effective_ownership(view)
+    # Jugador con más EO de capitán en cada jornada
+    captains = eo.loc[eo.groupby('gameweek')['captain_eo'].idxmax(),
+                      ['gameweek', 'player_name', 'player_team', 'captain_eo', 'eo', 'player_points']]
+    differentials = ownership.differentials(view)
+    # Mapa de calor de los primeros de la clasificación y pares de equipos
+    # con más plantilla compartida de toda la selección
+    similarity = ownership.similarity(view, limit=charts.LARGE_LEAGUE)
+    pairs = ownership.similar_pairs(view, n=10)
+    return (
+        charts.eo_figure(eo),
+        captains.reset_index(drop=True),
+        charts.differentials_figure(differentials),
+        differentials,
+        charts.similarity_figure(similarity),
+        pairs,
+    )
+
+@st.cache_data(max_entries=32)
+def transfers_section(league_id, version, gw_range, managers, horizon, _cube, _transfers):
+    import charts
+    view = _cube.select(gw_range, managers)
+    log = get_transfer_log(league_id, version, _transfers, _cube)
+    points = get_player_points(league_id, version, tuple(_cube.gameweeks.tolist()))
+    summary = log.summary(view, points, horizon)
+    return charts.transfers_roi_figure(summary, horizon), summary
+
+@st.cache_data(max_entries=16)
+def projection_section(league_id, version, seasons, relegation_spots, managers, _cube):
+    import charts
+    projection = simulate_season(league_id, version, seasons, relegation_spots, _cube)
+    projection = projection[projection['team_name'].isin(managers)]
+    return charts.projection_figure(projection.head(20)), projection
+
+@st.cache_data(max_entries=32)
+def league_table(league_id, version, gw_range, managers, _df, _cube):
+    # Tabla de la liga con los wildcards como columna ya unida
+    view = _cube.select(gw_range, managers)
+    table = view.frame(
+        points=_cube.points, cost=_cube.cost, total=_cube.total_points,
+        position=_cube.total_ranks, wildcard_used=_cube.wildcard
+    )
+    names = _df.drop_duplicates('manager_id').set_index('manager_id')['manager_name']
+    table.insert(2, 'manager_name', table['manager_id'].map(names))
+    table = table.drop(columns='manager_id').sort_values(['gameweek', 'position'], kind='stable', ignore_index=True)
+    table['position'] = table['position'].astype(int)
+    return table
+
+def style_wildcards(table):
+    """Resalta las filas con wildcard en una sola pasada vectorizada"""
+    wildcard = table['wildcard_used'].to_numpy()
+    shown = table.drop(columns='wildcard_used')
+    css = np.where(wildcard[:, None], 'background-color: lightgreen', '')
+    return shown.style.apply(
+        lambda frame: pd.DataFrame(np.broadcast_to(css, frame.shape), index=frame.index, columns=frame.columns),
+        axis=None
+    )
+
+
 
 
 
 
 if df is not None:
+    # Tiempo de render por sección (panel "Rendimiento interno")
+    stopwatch = fpl.metrics.stopwatch()
+    
     # Filtros superiores
     st.sidebar.header('Filtros')
     
@@ -211,21 +327,22 @@ if df is not None:
             default=[]
         )
     
-    # Filtrar datos
-    filtered_df = df[
-        (df['gameweek'].between(gw_range[0], gw_range[1])) & 
-        (df['team_name'].isin(selected_managers))
-    ].copy()
+    # Filtrar datos: se corta el cubo precomputado en lugar de filtrar df
+    cube = get_cube(league_id, snapshot.version, df)
+    view = cube.select(gw_range, selected_managers)
+    if view.empty:
+        st.info("Selecciona al menos un equipo")
+        st.stop()
+    stopwatch.lap('Filtros')
 
     #Métricas principales mejoradas
-    latest_gw = filtered_df['gameweek'].max()
-    current_gw_data = filtered_df[filtered_df['gameweek'] == latest_gw]
+    latest_gw = view.latest_gameweek()
 
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        avg_points = current_gw_data['gameweek_points'].mean()
-        avg_points_prev = filtered_df[filtered_df['gameweek'] == latest_gw - 1]['gameweek_points'].mean()
+        avg_points = view.mean_points(latest_gw)
+        avg_points_prev = view.mean_points(latest_gw - 1)
         st.metric(
             "Promedio de Puntos GW actual", 
             f"{avg_points:.1f}", 
@@ -233,204 +350,269 @@ if df is not None:
         )
     
     with col2:
-        highest_score_current = current_gw_data.nlargest(1, 'gameweek_points').iloc[0]
+        points, team, _ = view.top(cube.points, latest_gw)
         st.metric(
             "Máxima Puntuación GW actual", 
-            f"{highest_score_current['gameweek_points']}", 
-            f"{highest_score_current['team_name']}"
+            f"{points}", 
+            f"{team}"
         )
     
     with col3:
-        current_transfers = current_gw_data.groupby('team_name')['transfers'].first()
-        most_transfers_current = current_transfers.nlargest(1)
+        transfers, team, _ = view.top(cube.transfers, latest_gw)
         st.metric(
             "Más Transferencias GW actual", 
-            f"{most_transfers_current.values[0]}", 
-            f"{most_transfers_current.index[0]}"
+            f"{transfers}", 
+            f"{team}"
         )
     
     with col4:
-        current_costs = current_gw_data.groupby('team_name')['transfer_cost'].first()
-        highest_cost_current = current_costs.nlargest(1)
+        cost, team, _ = view.top(cube.cost, latest_gw)
         st.metric(
             "Mayor Costo GW actual", 
-            f"{highest_cost_current.values[0]}", 
-            f"{highest_cost_current.index[0]}"
+            f"{cost}", 
+            f"{team}"
         )
+    stopwatch.lap('Métricas GW actual')
 
     
     # Métricas principales
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Promedio de Puntos", f"{filtered_df['gameweek_points'].mean():.1f}")
+        st.metric("Promedio de Puntos", f"{view.mean_points():.1f}")
         st.divider()  
         ### promedio de puntos ultimo gameweek
     with col2:
-        highest_score = filtered_df.nlargest(1, 'gameweek_points').iloc[0]
-        st.metric("Máxima Puntuación", f"{highest_score['gameweek_points']}", f"({highest_score['team_name']}, GW{highest_score['gameweek']})",delta_color="off")
+        points, team, gw = view.top(cube.points)
+        st.metric("Máxima Puntuación", f"{points}", f"({team}, GW{gw})",delta_color="off")
         st.divider()  
         ### MAXIMA PUTUACION EN ESTE GAMEWEEK
     with col3:
-        most_transfers = filtered_df.nlargest(1, 'transfers').iloc[0]
-        st.metric("Más Transferencias", f"{most_transfers['transfers']}",f"({most_transfers['team_name']}, GW{most_transfers['gameweek']})",delta_color="off")
+        transfers, team, gw = view.top(cube.transfers)
+        st.metric("Más Transferencias", f"{transfers}",f"({team}, GW{gw})",delta_color="off")
         st.divider()  
         #### MOST TRANSFERS THIS GAMEWEEK
     with col4:
-        highest_cost = filtered_df.nlargest(1, 'transfer_cost').iloc[0]
-        st.metric("Mayor Costo", f"{highest_cost['transfer_cost']}",f"({highest_cost['team_name']}, GW{highest_cost['gameweek']})",delta_color="off")
+        cost, team, gw = view.top(cube.cost)
+        st.metric("Mayor Costo", f"{cost}",f"({team}, GW{gw})",delta_color="off")
         st.divider()  
         ### MAYOR COSTO THIS GAMEWEEK
+    stopwatch.lap('Métricas generales')
         
     
-    # Visualizaciones
-    tab1, tab2, tab3 = st.tabs(["📈 Rendimiento", "👥 Equipos", "🌟 Capitanes"])
+    # Visualizaciones: solo se calcula y dibuja la sección elegida
+    section = st.radio(
+        'Sección',
+        ["📈 Rendimiento", "👥 Equipos", "🌟 Capitanes", "🧩 Ownership", "🔁 Transferencias",
+         "📋 Tabla", "🔮 Proyección"],
+        horizontal=True,
+        label_visibility='collapsed'
+    )
+    managers = tuple(selected_managers)
     
-    with tab1:
+    if section == "📈 Rendimiento":
+        import charts
+        fig_points, fig_positions = performance_figures(league_id, snapshot.version, gw_range, managers, cube)
+        
+        # Opacidad por equipo: una sola tabla editable en lugar de un slider
+        # por equipo, aplicada a cada figura en una pasada antes de dibujarla
+        with st.expander('Opacidad'):
+            opacity_df = st.data_editor(
+                pd.DataFrame({'team_name': list(managers), 'opacity': 1.0}),
+                column_config={
+                    'team_name': st.column_config.TextColumn('Equipo', disabled=True),
+                    'opacity': st.column_config.NumberColumn('Opacidad', min_value=0.0, max_value=1.0, step=0.1),
+                },
+                hide_index=True,
+                key=f'opacity_{league_id}'
+            )
+        opacities = dict(zip(opacity_df['team_name'], opacity_df['opacity']))
+        
         # Evolución de puntos
         st.subheader('Evolución de Puntos')
-        points_df = filtered_df.groupby(['gameweek', 'team_name'])['gameweek_points'].max().reset_index()
-        fig_points = px.line(points_df, 
-                           x='gameweek', 
-                           y='gameweek_points', 
-                           color='team_name',
-                           title='Puntos por Jornada')
-        st.plotly_chart(fig_points, use_container_width=True)
+        st.plotly_chart(charts.apply_opacity(fig_points, opacities), use_container_width=True)
+        stopwatch.lap('Evolución de Puntos')
         
         # Posiciones De Cada Gameweek
         st.subheader('Evolución de Posiciones')
-        cumulative_df = filtered_df.groupby(['gameweek', 'team_name'])['gameweek_points'].sum().groupby(level=0).rank(ascending=False).reset_index()
-        fig_positions = px.line(cumulative_df, 
-                              x='gameweek', 
-                              y='gameweek_points', 
-                              color='team_name',
-                              title='Posiciones por Jornada')
-        fig_positions.update_yaxes(autorange="reversed")
-        st.plotly_chart(fig_positions, use_container_width=True)
+        st.plotly_chart(charts.apply_opacity(fig_positions, opacities), use_container_width=True)
+        stopwatch.lap('Evolución de Posiciones')
         
-                # Posiciones acumuladas
+        # Posiciones acumuladas
         st.subheader('Evolución de Posiciones Acumuladas')
-        cumulative_points = df.groupby(['gameweek', 'team_name'])['gameweek_points'].first().groupby('team_name').cumsum().reset_index()
-        cumulative_ranks = cumulative_points.groupby('gameweek').rank(ascending=False, method='min')
-        cumulative_df = pd.DataFrame({
-            'gameweek': cumulative_points['gameweek'],
-            'team_name': cumulative_points['team_name'],
-            'position': cumulative_ranks
-        })
-        
-        fig_cumulative = px.line(
-            cumulative_df,
-            x='gameweek',
-            y='position',
-            color='team_name',
-            title='Posiciones Acumuladas por Jornada'
-        )
-        fig_cumulative.update_layout(
-            title_x=0.5,
-            yaxis={'autorange': 'reversed'},
-            xaxis_title='Jornada',
-            yaxis_title='Posición',
-        )
-        st.plotly_chart(fig_cumulative, use_container_width=True)
+        st.plotly_chart(cumulative_figure(league_id, snapshot.version, cube), use_container_width=True)
+        stopwatch.lap('Posiciones Acumuladas')
 
-    with tab2:
+    elif section == "👥 Equipos":
         # Análisis de equipos
         st.subheader('Análisis de Equipos')
+        fig_box, fig_transfers, fig_costs = team_figures(league_id, snapshot.version, gw_range, managers, cube)
         
         # Distribución de puntos
-        fig_box = px.box(filtered_df, 
-                        x='team_name', 
-                        y='gameweek_points',
-                        title='Distribución de Puntos por Equipo')
         st.plotly_chart(fig_box, use_container_width=True)
         
         # Transferencias y costos
-        transfers_df = filtered_df.groupby('team_name').agg({
-            'transfers': 'sum',
-            'transfer_cost': 'sum'
-        }).reset_index()
-        
         col1, col2 = st.columns(2)
         with col1:
-            fig_transfers = px.bar(transfers_df, 
-                                 x='team_name', 
-                                 y='transfers',
-                                 title='Total de Transferencias')
             st.plotly_chart(fig_transfers, use_container_width=True)
         
         with col2:
-            fig_costs = px.bar(transfers_df, 
-                             x='team_name', 
-                             y='transfer_cost',
-                             title='Costo Total de Transferencias')
             st.plotly_chart(fig_costs, use_container_width=True)
+            stopwatch.lap('Análisis de Equipos')
 
-
+            # Wildcards y jugadores: toda la liga, no dependen de los filtros
+            fig_wildcards, fig_players = league_figures(league_id, snapshot.version, cube, picks_df)
+            
             # Añadir análisis de wildcards
             st.header('Análisis de Wildcards')
-            wildcards_used = df[df['wildcard_used']].groupby(['team_name', 'gameweek']).size().reset_index()
-            wildcards_used.columns = ['team_name', 'gameweek', 'count']
-            
-            fig_wildcards = px.scatter(
-                wildcards_used,
-                x='gameweek',
-                y='team_name',
-                size='count',
-                title='Uso de Wildcards por Equipo'
-            )
-            fig_wildcards.update_layout(
-                title_x=0.5,
-                xaxis_title='Jornada',
-                yaxis_title='Equipo',
-            )
             st.plotly_chart(fig_wildcards, use_container_width=True)
+            stopwatch.lap('Análisis de Wildcards')
             
             # Análisis de jugadores
             st.header('Análisis de Jugadores')
-            player_stats = df.explode('squad').reset_index(drop=True)
-            top_players = player_stats.groupby('player_name').agg({
-                'is_captain': 'sum',
-                'gameweek_points': 'mean',
-                'player_team': 'first'
-            }).sort_values('gameweek_points', ascending=False)
-            
-            fig_players = px.bar(
-                top_players.head(15),
-                x='player_name',
-                y='gameweek_points',
-                color='player_team',
-                title='Top 15 Jugadores por Promedio de Puntos'
-            )
-            fig_players.update_layout(
-                title_x=0.5,
-                xaxis_title='Jugador',
-                yaxis_title='Promedio de Puntos',
-                showlegend=True
-            )
-            st.plotly_chart(fig_players, use_container_width=True)
+            if picks_df.empty:
+                st.info("Esta liga no tiene alineaciones")
+            else:
+                st.plotly_chart(fig_players, use_container_width=True)
+            stopwatch.lap('Análisis de Jugadores')
     
-    with tab3:
+    elif section == "🌟 Capitanes" and picks_df.empty:
+        # La liga offline no tiene alineaciones
+        st.info("Esta liga no tiene alineaciones")
+
+    elif section == "🌟 Capitanes":
+        fig_captains, fig_lost, captain_details = captain_section(
+            league_id, snapshot.version, gw_range, managers, cube, picks_df
+        )
         # Análisis de capitanes
         st.subheader('Análisis de Capitanes')
-        captains_df = filtered_df[filtered_df['is_captain']].groupby(['player_name', 'player_team']).size().reset_index(name='times_captain')
-        captains_df = captains_df.sort_values('times_captain', ascending=False)
-        
-        fig_captains = px.bar(captains_df.head(10), 
-                            x='player_name', 
-                            y='times_captain',
-                            color='player_team',
-                            title='Jugadores Más Capitaneados')
         st.plotly_chart(fig_captains, use_container_width=True)
+        stopwatch.lap('Análisis de Capitanes')
+        
+        # Puntos perdidos frente al mejor capitán y al mejor orden del banquillo
+        st.subheader('Puntos Perdidos por Decisiones')
+        st.plotly_chart(fig_lost, use_container_width=True)
+        stopwatch.lap('Puntos Perdidos')
         
         # Tabla detallada de capitanes por gameweek
         st.subheader('Capitanes por Jornada')
-        captain_details = filtered_df[filtered_df['is_captain']].pivot_table(
-            index='gameweek',
-            columns='team_name',
-            values='player_name',
-            aggfunc='first'
-        )
         st.dataframe(captain_details)
+        stopwatch.lap('Capitanes por Jornada')
+
+    elif section == "🧩 Ownership" and picks_df.empty:
+        st.info("Esta liga no tiene alineaciones")
+
+    elif section == "🧩 Ownership":
+        fig_eo, captains_eo, fig_differentials, differentials, fig_similarity, pairs = ownership_section(
+            league_id, snapshot.version, gw_range, managers, cube, picks_df
+        )
+        # Ownership efectivo: fracción de la liga que tiene (y capitanea) a
+        # cada jugador, ponderada por el multiplicador
+        st.subheader('Ownership Efectivo')
+        st.plotly_chart(fig_eo, use_container_width=True)
+        st.dataframe(captains_eo, hide_index=True)
+        stopwatch.lap('Ownership Efectivo')
+
+        # Puntos ganados frente a la liga y con jugadores poco elegidos
+        st.subheader('Diferenciales')
+        st.plotly_chart(fig_differentials, use_container_width=True)
+        st.dataframe(differentials, hide_index=True)
+        stopwatch.lap('Diferenciales')
+
+        # Solapamiento de plantillas entre equipos
+        st.subheader('Similitud de Plantillas')
+        st.plotly_chart(fig_similarity, use_container_width=True)
+        st.dataframe(pairs, hide_index=True)
+        stopwatch.lap('Similitud de Plantillas')
+
+    elif section == "🔁 Transferencias" and (snapshot.transfers is None or snapshot.transfers.empty):
+        st.info("Esta liga no tiene registro de transferencias")
+
+    elif section == "🔁 Transferencias":
+        horizon = st.slider('Jornadas evaluadas tras cada fichaje', 1, 8, 3)
+        fig_roi, roi = transfers_section(
+            league_id, snapshot.version, gw_range, managers, horizon, cube, snapshot.transfers
+        )
+        # Puntos de los jugadores que entraron frente a los que salieron
+        st.subheader('Rentabilidad de las Transferencias')
+        st.plotly_chart(fig_roi, use_container_width=True)
+        st.dataframe(roi, hide_index=True)
+        stopwatch.lap('Rentabilidad de las Transferencias')
+
+        # Registro de un equipo en una jornada (consulta por el índice)
+        st.subheader('Registro de Transferencias')
+        col1, col2 = st.columns(2)
+        with col1:
+            log_team = st.selectbox('Equipo', list(managers))
+        with col2:
+            log_gameweeks = [int(gw) for gw in all_gameweeks if gw_range[0] <= gw <= gw_range[1]]
+            log_gw = st.selectbox('Jornada', log_gameweeks, index=len(log_gameweeks) - 1)
+        log = get_transfer_log(league_id, snapshot.version, snapshot.transfers, cube)
+        manager_id = cube.manager_ids[np.flatnonzero(cube.team_names == log_team)[0]]
+        moves = log.lookup(manager_id, log_gw)
+        names = picks_df.drop_duplicates('player_id').set_index('player_id')['player_name'].astype(str)
+        st.dataframe(pd.DataFrame({
+            'time': moves['time'],
+            'player_in': moves['player_in'].map(names).fillna(moves['player_in'].astype(str)),
+            'player_out': moves['player_out'].map(names).fillna(moves['player_out'].astype(str)),
+            'price_in': moves['price_in'] / 10,
+            'price_out': moves['price_out'] / 10,
+        }), hide_index=True)
+        stopwatch.lap('Registro de Transferencias')
+
+    elif section == "📋 Tabla":
+        # Tabla de la liga; las jornadas con wildcard se resaltan en verde
+        # (en tablas muy grandes, se marcan en una columna)
+        show_single_gw = st.checkbox('Mostrar solo la última jornada seleccionada')
+        if show_single_gw:
+            st.subheader(f'Tabla de la Liga - Jornada {gw_range[1]}')
+            table_range = (gw_range[1], gw_range[1])
+        else:
+            st.subheader(f'Tabla de la Liga - Jornadas {gw_range[0]} a {gw_range[1]}')
+            table_range = gw_range
+        table = league_table(league_id, snapshot.version, table_range, managers, df, cube)
+        if table.size <= pd.get_option('styler.render.max_elements'):
+            st.dataframe(style_wildcards(table), hide_index=True)
+        else:
+            # Streamlit no acepta un Styler con más celdas: el wildcard se
+            # muestra como columna
+            st.dataframe(table, hide_index=True, column_config={
+                'wildcard_used': st.column_config.CheckboxColumn('Wildcard')
+            })
+        stopwatch.lap('Tabla de la Liga')
+
+    elif section == "🔮 Proyección":
+        # Simulación Monte Carlo del resto de la temporada (toda la liga)
+        st.subheader('Proyección de Final de Temporada')
+        col1, col2 = st.columns(2)
+        with col1:
+            seasons = st.select_slider(
+                'Temporadas simuladas',
+                options=[10_000, 50_000, 100_000, 500_000],
+                value=100_000
+            )
+        with col2:
+            relegation_spots = st.number_input('Puestos de descenso', min_value=1, max_value=10, value=3)
+        fig_projection, projection = projection_section(
+            league_id, snapshot.version, seasons, relegation_spots, managers, cube
+        )
+        st.plotly_chart(fig_projection, use_container_width=True)
+        st.dataframe(
+            projection.style.format({
+                'expected_points': '{:.0f}', 'expected_position': '{:.1f}',
+                'p_title': '{:.1%}', 'p_top3': '{:.1%}', 'p_relegation': '{:.1%}'
+            }),
+            hide_index=True
+        )
+        stopwatch.lap('Proyección')
 
 else:
     st.error("No se pudieron cargar los datos. Por favor, intenta más tarde.")
+
+# Panel oculto de rendimiento: se activa con ?debug=1 en la URL
+if st.query_params.get('debug') == '1':
+    with st.sidebar.expander('Rendimiento interno'):
+        st.caption('Peticiones por endpoint (latencias en ms)')
+        st.dataframe(fpl.metrics.endpoint_summary(), hide_index=True)
+        st.caption('Tiempo de render por sección (ms)')
+        st.dataframe(fpl.metrics.section_summary(), hide_index=True)
@@ -0,0 +1,295 @@
+"""Benchmarks de la carga y las agregaciones contra una API de la FPL local
+
+Levanta en un proceso aparte un servidor HTTP que imita los endpoints de
+fantasy.premierleague.com con datos sintéticos y deterministas, y mide para
+cada tamaño de liga las etapas:
+
+- fetch:     process_league_data con la caché vacía (red + construcción)
+- build:     process_league_data con la caché persistente caliente (sin red)
+- aggregate: las agregaciones que hace el dashboard (incluida la
+             construcción del LeagueCube y del WhatIf)
+
+Para cada etapa se informa tiempo, número de peticiones al servidor y pico
+de memoria (tracemalloc, que añade algo de sobrecarga).
+
+    python bench.py --managers 10 100 1000 --gameweeks 38
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from analytics import WhatIf
+from cube import LeagueCube
+from fpl_data import FPLData
+
+LEAGUE_ID = 1
+N_PLAYERS = 700
+N_TEAMS = 20
+PAGE_SIZE = 50
+
+class FakeFPL:
+    """Genera payloads sintéticos con la forma de la API de la FPL"""
+    def __init__(self, managers, gameweeks, live=False):
+        self.managers = managers
+        self.gameweeks = gameweeks
+        self.live = live  # la última gameweek sigue en juego
+
+    def entry_id(self, index):
+        return 1000000 + index
+
+    def bootstrap_static(self):
+        positions = ['GKP', 'DEF', 'MID', 'FWD']
+        return {
+            'elements': [
+                {'id': i, 'first_name': f"Nombre{i}", 'second_name': f"Apellido{i}",
+                 'web_name': f"Jugador{i}", 'team': i % N_TEAMS + 1,
+                 'element_type': i % 4 + 1, 'now_cost': 45 + i % 80}
+                for i in range(1, N_PLAYERS + 1)
+            ],
+            'teams': [{'id': t, 'name': f"Equipo {t}", 'short_name': f"E{t:02d}"} for t in range(1, N_TEAMS + 1)],
+            'element_types': [
+                {'id': i + 1, 'singular_name_short': name} for i, name in enumerate(positions)
+            ],
+            'events': [
+                {'id': gw, 'name': f"Gameweek {gw}",
+                 'finished': gw < self.gameweeks or (gw == self.gameweeks and not self.live),
+                 'data_checked': gw < self.gameweeks or (gw == self.gameweeks and not self.live),
+                 'is_current': gw == self.gameweeks, 'is_next': gw == self.gameweeks + 1}
+                for gw in range(1, 39)
+            ],
+        }
+
+    def event_status(self):
+        return {
+            'status': [{'event': self.gameweeks, 'points': '' if self.live else 'r',
+                        'bonus_added': not self.live, 'date': '2024-01-01'}],
+            'leagues': 'Updated',
+        }
+
+    def league_info(self):
+        return {'name': f"Liga sintética {self.managers}"}
+
+    def standings(self, page):
+        start = (page - 1) * PAGE_SIZE
+        stop = min(start + PAGE_SIZE, self.managers)
+        return {
+            'league': {'id': LEAGUE_ID, 'name': f"Liga sintética {self.managers}"},
+            'standings': {
+                'has_next': stop < self.managers,
+                'page': page,
+                'results': [
+                    {'entry': self.entry_id(i), 'player_name': f"Manager {i}",
+                     'entry_name': f"Equipo {i}", 'rank': i + 1, 'total': 0, 'event_total': 0}
+                    for i in range(start, stop)
+                ],
+            },
+        }
+
+    def history(self, entry):
+        rng = random.Random(entry)
+        total = 0
+        current = []
+        for gw in range(1, self.gameweeks + 1):
+            points = rng.randint(15, 110)
+            total += points
+            current.append({
+                'event': gw, 'points': points, 'total_points': total,
+                'rank': rng.randint(1, 10_000_000), 'overall_rank': rng.randint(1, 10_000_000),
+                'bank': rng.randint(0, 50), 'value': rng.randint(990, 1050),
+                'event_transfers': rng.randint(0, 3), 'event_transfers_cost': rng.choice([0, 0, 0, 4, 8]),
+                'points_on_bench': rng.randint(0, 20),
+            })
+        chips = []
+        if self.gameweeks > 2:
+            chips.append({'name': 'wildcard', 'event': rng.randint(2, self.gameweeks), 'time': ''})
+        return {'current': current, 'past': [], 'chips': chips}
+
+    def picks(self, entry, gameweek):
+        rng = random.Random(entry * 100 + gameweek)
+        elements = rng.sample(range(1, N_PLAYERS + 1), 15)
+        captain, vice = rng.sample(range(11), 2)
+        return {
+            'active_chip': None,
+            'automatic_subs': [],
+            'picks': [
+                {'element': element, 'position': i + 1,
+                 'multiplier': 0 if i >= 11 else 2 if i == captain else 1,
+                 'is_captain': i == captain, 'is_vice_captain': i == vice}
+                for i, element in enumerate(elements)
+            ],
+        }
+
+    def transfers(self, entry):
+        rng = random.Random(entry + 1)
+        return [
+            {'element_in': rng.randint(1, N_PLAYERS), 'element_in_cost': rng.randint(45, 130),
+             'element_out': rng.randint(1, N_PLAYERS), 'element_out_cost': rng.randint(45, 130),
+             'entry': entry, 'event': gw, 'time': f"2024-01-01T{gw % 24:02d}:{i:02d}:00Z"}
+            for gw in range(self.gameweeks, 1, -1) for i in range(rng.randint(0, 2))
+        ]
+
+    def event_live(self, gameweek):
+        rng = random.Random(gameweek)
+        return {
+            'elements': [
+                {'id': i, 'stats': {'minutes': rng.choice([0, 0, 30, 90, 90]),
+                                    'total_points': rng.randint(0, 15), 'bonus': rng.choice([0, 0, 0, 1, 2, 3])},
+                 'explain': []}
+                for i in range(1, N_PLAYERS + 1)
+            ],
+        }
+
+    def route(self, path):
+        """Payload para una ruta de la API, o None si no existe"""
+        if path.endswith('/bootstrap-static/'):
+            return self.bootstrap_static()
+        if path.endswith('/event-status/'):
+            return self.event_status()
+        match = re.search(r'/leagues-classic/\d+/standings/\?page_standings=(\d+)$', path)
+        if match:
+            return self.standings(int(match.group(1)))
+        if re.search(r'/leagues-classic/\d+/$', path):
+            return self.league_info()
+        match = re.search(r'/entry/(\d+)/history/$', path)
+        if match:
+            return self.history(int(match.group(1)))
+        match = re.search(r'/entry/(\d+)/transfers/$', path)
+        if match:
+            return self.transfers(int(match.group(1)))
+        match = re.search(r'/entry/(\d+)/event/(\d+)/picks/$', path)
+        if match:
+            return self.picks(int(match.group(1)), int(match.group(2)))
+        match = re.search(r'/event/(\d+)/live/$', path)
+        if match:
+            return self.event_live(int(match.group(1)))
+        return None
+
+def _serve(fake, counter, ready):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True  # evita el retardo de 40 ms con keep-alive
+
+        def do_GET(self):
+            with counter.get_lock():
+                counter.value += 1
+            payload = fake.route(self.path)
+            body = json.dumps(payload).encode() if payload is not None else b'{}'
+            self.send_response(200 if payload is not None else 404)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+class FakeServer:
+    """Servidor de la API sintética en un proceso aparte"""
+    def __init__(self, fake):
+        self.counter = multiprocessing.Value('i', 0)
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(fake, self.counter, ready), daemon=True
+        )
+        self.process.start()
+        self.base_url = f"http://127.0.0.1:{ready.get(timeout=10)}/api/"
+
+    @property
+    def requests(self):
+        return self.counter.value
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+def dashboard_aggregations(df, picks):
+    """Las agregaciones que hace app.py con todos los filtros abiertos"""
+    cube = LeagueCube(df)
+    view = cube.select((cube.gameweeks[0], cube.gameweeks[-1]), cube.team_names)
+    latest_gw = view.latest_gameweek()
+    view.mean_points(latest_gw)
+    for matrix in (cube.points, cube.transfers, cube.cost):
+        view.top(matrix, latest_gw)
+        view.top(matrix)
+    view.points()
+    view.positions()
+    cube.cumulative_positions()
+    view.totals()
+    cube.wildcards()
+    picks.groupby('player_name', observed=True).agg(
+        {'is_captain': 'sum', 'player_points': 'mean', 'player_team': 'first'}
+    )
+    captains = picks[picks['is_captain']].merge(view.keys(), on=['manager_id', 'gameweek'])
+    captains.groupby(['player_name', 'player_team'], observed=True).size()
+    captains.pivot_table(index='gameweek', columns='team_name', values='player_name', aggfunc='first', observed=True)
+    WhatIf(picks, cube.manager_ids, cube.gameweeks).summary(view)
+
+def measure(stage, server, func):
+    """Ejecuta func y devuelve (resultado, fila de métricas)"""
+    requests_before = server.requests if server else 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        'stage': stage,
+        'wall_s': round(elapsed, 3),
+        'requests': (server.requests if server else 0) - requests_before,
+        'peak_mb': round(peak / 2**20, 1),
+    }
+
+def run(managers, gameweeks, workers, live=False):
+    """Mide las tres etapas para una liga sintética"""
+    server = FakeServer(FakeFPL(managers, gameweeks, live))
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'http.sqlite')
+
+            def crawl():
+                fpl = FPLData(max_workers=workers, requests_per_second=100_000,
+                              cache_path=cache_path, base_url=server.base_url)
+                return fpl.process_league_data(LEAGUE_ID)
+
+            (df, picks), row = measure('fetch', server, crawl)
+            rows.append(row)
+            _, row = measure('build', server, crawl)
+            rows.append(row)
+            _, row = measure('aggregate', None, lambda: dashboard_aggregations(df, picks))
+            rows.append(row)
+    finally:
+        server.stop()
+    for row in rows:
+        row.update({'managers': managers, 'gameweeks': gameweeks})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de FPLData contra una API sintética local")
+    parser.add_argument('--managers', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--gameweeks', type=int, default=38)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--live', action='store_true', help="La última gameweek sigue en juego")
+    args = parser.parse_args()
+
+    results = []
+    for managers in args.managers:
+        results.extend(run(managers, args.gameweeks, args.workers, args.live))
+        print(pd.DataFrame(results).to_string(index=False), end='\n\n')
+
+if __name__ == '__main__':
+    main()
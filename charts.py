@@ -0,0 +1,277 @@
+"""Figuras del dashboard
+
+Cada función recibe los datos ya agregados (normalmente de una vista del
+LeagueCube) y devuelve la figura de Plotly. No dependen de Streamlit, así
+que app.py puede memoizarlas con st.cache_data y renderizar solo la sección
+visible.
+
+En ligas grandes (más de LARGE_LEAGUE equipos) las figuras se mantienen
+pequeñas: las líneas se dibujan con WebGL solo para los TOP_N mejores
+equipos y el resto de la liga se resume en una banda p10-p90 con su
+mediana, y las cajas se envían como estadísticos ya calculados en lugar de
+todos los puntos. Los ejes van como arrays numéricos, que Plotly serializa
+en binario.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+LARGE_LEAGUE = 30  # Equipos a partir de los cuales se usa el modo liga grande
+TOP_N = 10         # Equipos con línea propia en el modo liga grande
+
+def _is_large(df):
+    return df['team_name'].nunique() > LARGE_LEAGUE
+
+def _line_figure(long_df, value, title, best='max', rank_by='mean'):
+    """Una línea por equipo o, en ligas grandes, top-N + banda del resto
+
+    best indica si el mejor equipo es el de mayor ('max') o menor ('min')
+    valor, y rank_by si se compara la media del rango o la última jornada.
+    """
+    if not _is_large(long_df):
+        return px.line(long_df, x='gameweek', y=value, color='team_name', title=title)
+
+    wide = long_df.pivot(index='team_name', columns='gameweek', values=value)
+    values = wide.to_numpy(dtype=np.float32)
+    gameweeks = wide.columns.to_numpy()
+    if rank_by == 'last':
+        # Último valor de cada equipo (los huecos se rellenan hacia delante)
+        score = wide.ffill(axis=1).iloc[:, -1].to_numpy(dtype=np.float32)
+    else:
+        score = np.nanmean(values, axis=1)
+    score = np.where(np.isnan(score), -np.inf if best == 'max' else np.inf, score)
+    order = np.argsort(-score if best == 'max' else score, kind='stable')
+    top, rest = order[:TOP_N], order[TOP_N:]
+
+    fig = go.Figure()
+    low, median, high = np.nanpercentile(values[rest], [10, 50, 90], axis=0)
+    fig.add_trace(go.Scattergl(x=gameweeks, y=low, mode='lines', line={'width': 0},
+                               hoverinfo='skip', showlegend=False))
+    fig.add_trace(go.Scattergl(x=gameweeks, y=high, mode='lines', line={'width': 0},
+                               fill='tonexty', fillcolor='rgba(150, 150, 150, 0.3)',
+                               name=f'Resto ({len(rest)} equipos, p10-p90)'))
+    fig.add_trace(go.Scattergl(x=gameweeks, y=median, mode='lines',
+                               line={'color': 'gray', 'dash': 'dash'}, name='Resto (mediana)'))
+    for row in top:
+        fig.add_trace(go.Scattergl(x=gameweeks, y=values[row], mode='lines', name=wide.index[row]))
+    fig.update_layout(title=title, xaxis_title='gameweek', yaxis_title=value, legend_title='team_name')
+    return fig
+
+def points_figure(points_df):
+    return _line_figure(points_df, 'gameweek_points', 'Puntos por Jornada')
+
+def positions_figure(positions_df):
+    fig = _line_figure(positions_df, 'gameweek_points', 'Posiciones por Jornada', best='min')
+    fig.update_yaxes(autorange="reversed")
+    return fig
+
+def cumulative_figure(cumulative_df):
+    fig = _line_figure(
+        cumulative_df, 'position', 'Posiciones Acumuladas por Jornada', best='min', rank_by='last'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        yaxis={'autorange': 'reversed'},
+        xaxis_title='Jornada',
+        yaxis_title='Posición',
+    )
+    return fig
+
+def box_figure(points_df):
+    if not _is_large(points_df):
+        return px.box(points_df,
+                      x='team_name',
+                      y='gameweek_points',
+                      title='Distribución de Puntos por Equipo')
+    # Cajas de los TOP_N equipos con más puntos de media y una del resto de
+    # la liga, con los cuartiles y bigotes (1.5 IQR, acotados a los datos)
+    # ya calculados: al navegador solo llegan seis números por caja
+    means = points_df.groupby('team_name')['gameweek_points'].mean()
+    top = means.nlargest(TOP_N).index
+    groups = points_df['team_name'].where(points_df['team_name'].isin(top), 'Resto')
+    grouped = points_df['gameweek_points'].groupby(groups)
+    order = list(means[top].sort_values(ascending=False).index) + ['Resto']
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack().reindex(order)
+    q1, median, q3 = (stats[q].to_numpy(dtype=np.float32) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    lower = np.maximum(grouped.min().reindex(order).to_numpy(dtype=np.float32), q1 - 1.5 * iqr)
+    upper = np.minimum(grouped.max().reindex(order).to_numpy(dtype=np.float32), q3 + 1.5 * iqr)
+    fig = go.Figure(go.Box(
+        x=order, q1=q1, median=median, q3=q3, lowerfence=lower, upperfence=upper,
+        mean=grouped.mean().reindex(order).to_numpy(dtype=np.float32), name='gameweek_points'
+    ))
+    fig.update_layout(title='Distribución de Puntos por Equipo', xaxis_title='team_name',
+                      yaxis_title='gameweek_points')
+    return fig
+
+def totals_figure(totals_df, column, title):
+    if _is_large(totals_df):
+        # Solo los equipos con el valor más alto
+        totals_df = totals_df.nlargest(2 * TOP_N, column)
+        title = f'{title} (Top {2 * TOP_N})'
+    return px.bar(totals_df,
+                  x='team_name',
+                  y=column,
+                  title=title)
+
+def wildcards_figure(wildcards_df, large=False):
+    if large:
+        # Un punto por equipo no se lee con cientos de equipos: cuántos
+        # activaron el wildcard en cada jornada
+        per_gameweek = wildcards_df.groupby('gameweek', as_index=False)['count'].sum()
+        fig = px.bar(per_gameweek, x='gameweek', y='count', title='Wildcards Activados por Jornada')
+        fig.update_layout(title_x=0.5, xaxis_title='Jornada', yaxis_title='Equipos')
+        return fig
+    fig = px.scatter(
+        wildcards_df,
+        x='gameweek',
+        y='team_name',
+        size='count',
+        title='Uso de Wildcards por Equipo'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title='Jornada',
+        yaxis_title='Equipo',
+    )
+    return fig
+
+def players_figure(top_players):
+    fig = px.bar(
+        top_players,
+        x='player_name',
+        y='player_points',
+        color='player_team',
+        title='Top 15 Jugadores por Promedio de Puntos'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title='Jugador',
+        yaxis_title='Promedio de Puntos',
+        showlegend=True
+    )
+    return fig
+
+def captains_figure(captains_df):
+    return px.bar(captains_df,
+                  x='player_name',
+                  y='times_captain',
+                  color='player_team',
+                  title='Jugadores Más Capitaneados')
+
+def lost_figure(lost_df):
+    fig = px.bar(
+        lost_df.melt(id_vars='team_name', value_vars=['captain_lost', 'bench_order_lost'],
+                     var_name='decision', value_name='points'),
+        x='team_name',
+        y='points',
+        color='decision',
+        title='Puntos Perdidos por Capitán y Orden del Banquillo (Top 20)'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title='Equipo',
+        yaxis_title='Puntos Perdidos',
+        legend_title='Decisión'
+    )
+    fig.for_each_trace(lambda trace: trace.update(
+        name={'captain_lost': 'Capitán', 'bench_order_lost': 'Orden del banquillo'}[trace.name]
+    ))
+    return fig
+
+def projection_figure(projection_df):
+    fig = px.bar(
+        projection_df.melt(id_vars='team_name', value_vars=['p_title', 'p_top3', 'p_relegation'],
+                           var_name='outcome', value_name='probability'),
+        x='team_name',
+        y='probability',
+        color='outcome',
+        barmode='group',
+        title='Probabilidad de Título, Top 3 y Descenso'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title='Equipo',
+        yaxis_title='Probabilidad',
+        yaxis_tickformat='.0%',
+        legend_title='Resultado'
+    )
+    fig.for_each_trace(lambda trace: trace.update(
+        name={'p_title': 'Título', 'p_top3': 'Top 3', 'p_relegation': 'Descenso'}[trace.name]
+    ))
+    return fig
+
+def eo_figure(eo_df):
+    # Jugadores con mayor EO medio en el rango
+    top = (eo_df.groupby('player_name', observed=True)[['ownership', 'eo']].mean()
+           .nlargest(15, 'eo').reset_index())
+    fig = px.bar(
+        top.melt(id_vars='player_name', value_vars=['ownership', 'eo'],
+                 var_name='metric', value_name='value'),
+        x='player_name',
+        y='value',
+        color='metric',
+        barmode='group',
+        title='Ownership y EO Medio en la Liga (Top 15)'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title='Jugador',
+        yaxis_title='Fracción de la liga',
+        yaxis_tickformat='.0%',
+        legend_title='Métrica'
+    )
+    fig.for_each_trace(lambda trace: trace.update(
+        name={'ownership': 'Ownership', 'eo': 'EO'}[trace.name]
+    ))
+    return fig
+
+def differentials_figure(differentials_df):
+    return px.bar(differentials_df.head(2 * TOP_N),
+                  x='team_name',
+                  y='gain_vs_league',
+                  color='differential_points',
+                  title=f'Puntos Ganados Frente a la Liga (Top {2 * TOP_N})')
+
+def similarity_figure(similarity_df):
+    if len(similarity_df) > LARGE_LEAGUE:
+        # Los LARGE_LEAGUE primeros de la clasificación
+        similarity_df = similarity_df.iloc[:LARGE_LEAGUE, :LARGE_LEAGUE]
+    fig = px.imshow(
+        similarity_df.to_numpy(dtype=np.float32),
+        x=list(similarity_df.columns),
+        y=list(similarity_df.index),
+        zmin=0,
+        zmax=1,
+        color_continuous_scale='Blues',
+        title='Plantilla Compartida entre Equipos'
+    )
+    fig.update_layout(title_x=0.5, xaxis_title='', yaxis_title='')
+    return fig
+
+def transfers_roi_figure(roi_df, horizon):
+    fig = px.bar(
+        roi_df.head(2 * TOP_N).melt(id_vars='team_name', value_vars=['roi', 'hits_cost'],
+                                    var_name='metric', value_name='points'),
+        x='team_name',
+        y='points',
+        color='metric',
+        barmode='group',
+        title=f'Rentabilidad de las Transferencias a {horizon} Jornadas (Top {2 * TOP_N})'
+    )
+    fig.update_layout(
+        title_x=0.5,
+        xaxis_title='Equipo',
+        yaxis_title='Puntos',
+        legend_title='Métrica'
+    )
+    fig.for_each_trace(lambda trace: trace.update(
+        name={'roi': 'Entran - salen', 'hits_cost': 'Coste de transferencias'}[trace.name]
+    ))
+    return fig
+
+def apply_opacity(fig, opacities):
+    """Opacidad por equipo (nombre de la traza -> opacidad) en una sola
+    pasada; las trazas sin entrada quedan opacas"""
+    fig.for_each_trace(lambda trace: trace.update(opacity=opacities.get(trace.name, 1.0)))
+    return fig
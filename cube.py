@@ -0,0 +1,190 @@
+"""Agregados precomputados de la liga
+
+LeagueCube convierte la tabla manager-gameweek en matrices densas
+managers × gameweeks (puntos, totales, transferencias, costos, wildcards) con sus
+sumas prefijas y las posiciones acumuladas de toda la liga. Se construye una
+vez por carga de datos; cualquier filtro de jornadas o de equipos se resuelve
+después cortando las matrices y restando sumas prefijas, sin groupbys.
+"""
+import numpy as np
+import pandas as pd
+
+def _prefix(matrix):
+    """Suma acumulada por filas con una columna inicial de ceros, de modo que
+    la suma de las columnas [lo, hi) es prefix[:, hi] - prefix[:, lo]"""
+    prefix = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.int64)
+    np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+    return prefix
+
+def _rank_desc(values, mask, method='average'):
+    """Ranking descendente por columna entre las celdas de mask
+
+    method='min' o 'average', como pandas.Series.rank. Las celdas fuera de
+    mask quedan como NaN.
+    """
+    ranks = np.full(values.shape, np.nan)
+    for col in range(values.shape[1]):
+        present = mask[:, col]
+        column = values[present, col]
+        ordered = np.sort(column)
+        greater = len(column) - np.searchsorted(ordered, column, side='right')
+        if method == 'min':
+            ranks[present, col] = greater + 1
+        else:
+            greater_equal = len(column) - np.searchsorted(ordered, column, side='left')
+            ranks[present, col] = (greater + 1 + greater_equal) / 2
+    return ranks
+
+class LeagueCube:
+    """Matrices managers × gameweeks de una liga"""
+    def __init__(self, df):
+        codes, manager_ids = pd.factorize(df['manager_id'])
+        self.manager_ids = np.asarray(manager_ids)
+        self.team_names = df.groupby(codes)['team_name'].first().to_numpy()
+        self.gameweeks = np.sort(df['gameweek'].unique())
+        cols = np.searchsorted(self.gameweeks, df['gameweek'].to_numpy())
+        shape = (len(self.manager_ids), len(self.gameweeks))
+
+        def matrix(column, dtype):
+            values = np.zeros(shape, dtype=dtype)
+            values[codes, cols] = df[column].to_numpy()
+            return values
+
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[codes, cols] = True
+        self.points = matrix('gameweek_points', np.int32)
+        self.total_points = matrix('total_points', np.int32)
+        self.transfers = matrix('transfers', np.int32)
+        self.cost = matrix('transfer_cost', np.int32)
+        self.wildcard = matrix('wildcard_used', bool)
+
+        self.points_prefix = _prefix(self.points)
+        self.transfers_prefix = _prefix(self.transfers)
+        self.cost_prefix = _prefix(self.cost)
+
+        # Posiciones acumuladas de toda la liga en cada jornada
+        self.cumulative_ranks = _rank_desc(self.points_prefix[:, 1:], self.present, method='min')
+        # Posiciones en la clasificación por el total neto (descontados los
+        # costos de transferencias), como el total que muestra la tabla
+        self.total_ranks = _rank_desc(self.total_points, self.present, method='min')
+
+    def select(self, gw_range, team_names):
+        """Vista de un rango de jornadas (inclusivo) y un subconjunto de equipos"""
+        rows = np.flatnonzero(np.isin(self.team_names, list(team_names)))
+        lo = np.searchsorted(self.gameweeks, gw_range[0], side='left')
+        hi = np.searchsorted(self.gameweeks, gw_range[1], side='right')
+        return CubeView(self, rows, lo, hi)
+
+    def all(self):
+        """Vista de toda la liga"""
+        return CubeView(self, np.arange(len(self.manager_ids)), 0, len(self.gameweeks))
+
+    def cumulative_positions(self):
+        """Posición acumulada de cada equipo en cada jornada (toda la liga)"""
+        return self.all().long(self.cumulative_ranks, 'position')
+
+    def wildcards(self):
+        """Jornadas en las que cada equipo activó el wildcard"""
+        rows, cols = np.nonzero(self.wildcard & self.present)
+        return pd.DataFrame({
+            'team_name': self.team_names[rows],
+            'gameweek': self.gameweeks[cols],
+            'count': 1,
+        }).sort_values(['team_name', 'gameweek'], ignore_index=True)
+
+class CubeView:
+    """Selección (equipos × rango de jornadas) sobre un LeagueCube"""
+    def __init__(self, cube, rows, lo, hi):
+        self.cube = cube
+        self.rows = rows
+        self.lo = lo
+        self.hi = hi
+        self.gameweeks = cube.gameweeks[lo:hi]
+        self.team_names = cube.team_names[rows]
+        self.present = cube.present[np.ix_(rows, np.arange(lo, hi))]
+
+    @property
+    def empty(self):
+        return not self.present.any()
+
+    def _slice(self, matrix):
+        return matrix[np.ix_(self.rows, np.arange(self.lo, self.hi))]
+
+    def latest_gameweek(self):
+        return self.gameweeks[np.flatnonzero(self.present.any(axis=0))[-1]]
+
+    def mean_points(self, gameweek=None):
+        """Promedio de puntos de la selección (o de una jornada)"""
+        points, present = self._slice(self.cube.points), self.present
+        if gameweek is not None:
+            col = np.flatnonzero(self.gameweeks == gameweek)
+            points, present = points[:, col], present[:, col]
+        return points[present].mean() if present.any() else np.nan
+
+    def top(self, matrix, gameweek=None):
+        """(valor, equipo, jornada) del máximo de una matriz del cubo; en
+        caso de empate gana el primero en el orden de la clasificación"""
+        values = self._slice(matrix).astype(np.int64)
+        values[~self.present] = np.iinfo(np.int64).min
+        if gameweek is not None:
+            values[:, self.gameweeks != gameweek] = np.iinfo(np.int64).min
+        row, col = np.unravel_index(np.argmax(values), values.shape)
+        return values[row, col], self.team_names[row], self.gameweeks[col]
+
+    def sum(self, matrix):
+        """Total por equipo en el rango de una matriz managers × gameweeks
+        del mismo tamaño que el cubo"""
+        return self._slice(matrix).sum(axis=1)
+
+    def range_sum(self, prefix):
+        """Total por equipo en el rango de jornadas a partir de una suma prefija"""
+        return prefix[self.rows, self.hi] - prefix[self.rows, self.lo]
+
+    def totals(self):
+        """Transferencias y costo total por equipo en el rango"""
+        return pd.DataFrame({
+            'team_name': self.team_names,
+            'transfers': self.range_sum(self.cube.transfers_prefix),
+            'transfer_cost': self.range_sum(self.cube.cost_prefix),
+        }).sort_values('team_name', ignore_index=True)
+
+    def long(self, matrix, name, sliced=False):
+        """Formato largo (gameweek, team_name, valor) de las celdas presentes,
+        ordenado por jornada y equipo"""
+        values = matrix if sliced else self._slice(matrix)
+        rows, cols = np.nonzero(self.present)
+        return pd.DataFrame({
+            'gameweek': self.gameweeks[cols],
+            'team_name': self.team_names[rows],
+            name: values[rows, cols],
+        }).sort_values(['gameweek', 'team_name'], kind='stable', ignore_index=True)
+
+    def frame(self, **matrices):
+        """Formato largo con varias matrices del cubo como columnas, además
+        de manager_id, ordenado por jornada y equipo"""
+        rows, cols = np.nonzero(self.present)
+        return pd.DataFrame({
+            'gameweek': self.gameweeks[cols],
+            'team_name': self.team_names[rows],
+            'manager_id': self.cube.manager_ids[self.rows[rows]],
+            **{name: self._slice(matrix)[rows, cols] for name, matrix in matrices.items()},
+        }).sort_values(['gameweek', 'team_name'], kind='stable', ignore_index=True)
+
+    def points(self):
+        return self.long(self.cube.points, 'gameweek_points')
+
+    def positions(self):
+        """Posición de cada equipo en cada jornada, según los puntos de esa
+        jornada, entre los equipos seleccionados"""
+        ranks = _rank_desc(self._slice(self.cube.points), self.present)
+        return self.long(ranks, 'gameweek_points', sliced=True)
+
+    def keys(self):
+        """(manager_id, gameweek, team_name) de las celdas seleccionadas, para
+        unir con la tabla de alineaciones"""
+        rows, cols = np.nonzero(self.present)
+        return pd.DataFrame({
+            'manager_id': self.cube.manager_ids[self.rows[rows]],
+            'gameweek': self.gameweeks[cols],
+            'team_name': self.team_names[rows],
+        })
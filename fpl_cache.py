@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+class HTTPCache:
+    """Caché persistente en SQLite para las respuestas de la API de la FPL
+
+    Cada respuesta se guarda comprimida bajo su clave (normalmente la URL)
+    junto con su fecha de expiración. Un ttl de None significa que la
+    respuesta no caduca nunca (p. ej. gameweeks ya terminadas).
+    """
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Con WAL basta sincronizar en los checkpoints: una escritura por
+        # respuesta no paga un fsync
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body BLOB NOT NULL, "
+            "stored_at REAL NOT NULL, expires_at REAL)"
+        )
+        self.conn.commit()
+        self.purge()
+
+    def get(self, key):
+        """Devuelve el cuerpo guardado (bytes) o None si no existe o caducó"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+        return zlib.decompress(body)
+
+    def set(self, key, body, ttl=None):
+        """Guarda un cuerpo (bytes); ttl en segundos o None para siempre"""
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, zlib.compress(body), now, expires_at)
+            )
+            self.conn.commit()
+
+    def purge(self):
+        """Elimina las respuestas caducadas"""
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            )
+            self.conn.commit()
@@ -0,0 +1,1119 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import ExitStack
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import requests
+from requests.adapters import HTTPAdapter
+
+from fpl_cache import HTTPCache
+from metrics import Metrics, endpoint_name
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Limitador de peticiones (token bucket) compartido entre hilos"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.rate
+            time.sleep(espera)
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave en una sola
+
+    El primer hilo que pide una clave ejecuta la función; los que llegan
+    mientras tanto esperan y reciben el mismo resultado (o la misma
+    excepción) sin repetir la petición.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # clave -> [evento, resultado, excepción]
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+        else:
+            try:
+                call[1] = func()
+            except BaseException as e:
+                call[2] = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call[0].set()
+        if call[2] is not None:
+            raise call[2]
+        return call[1]
+
+class FPLAPIError(Exception):
+    """La API de la FPL devolvió un error o no respondió"""
+
+class CircuitOpenError(FPLAPIError):
+    """El circuit breaker está abierto: la petición ni se intenta"""
+
+class CircuitBreaker:
+    """Corta las peticiones tras varios fallos seguidos
+
+    Tras failure_threshold fallos consecutivos el circuito se abre y toda
+    petición falla al instante durante reset_timeout segundos. Después se
+    deja pasar una petición de prueba (semiabierto): si va bien se cierra,
+    si falla se vuelve a abrir.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def before_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("La API de la FPL no responde; se reintentará más tarde")
+            self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+
+    def wait_time(self):
+        """Segundos hasta que el circuito admita una petición de prueba"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+STANDINGS_PAGE_SIZE = 50     # Managers por página de clasificación
+STANDINGS_PAGES_AHEAD = 2    # Páginas en proceso a la vez (acota la memoria)
+
+# Etapa de construcción
+BUILD_QUEUE_SIZE = 4        # Páginas descargadas a la espera de construirse
+BUILD_PROCESS_MIN = 1000    # Managers a partir de los cuales se construye en procesos
+TRANSFERS = 'transfers'     # Marca de la petición de transferencias de un manager
+
+# Capa HTTP
+REQUEST_TIMEOUT = (3.05, 10)   # Segundos de conexión y de lectura
+MAX_RETRIES = 4                # Reintentos por petición
+BACKOFF_BASE = 0.5             # Segundos; se duplica en cada reintento
+BACKOFF_MAX = 30
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DEFERRED_TIMEOUT = 120         # Segundos como máximo para reintentar lo diferido
+
+# Política de frescura de la caché persistente (segundos)
+LIVE_TTL = 60              # Gameweek en curso y clasificaciones
+BOOTSTRAP_TTL = 6 * 3600   # bootstrap-static (precios cambian a diario)
+
+# Tabla larga de alineaciones: una fila por pick, unible a la tabla de
+# managers por (manager_id, gameweek)
+PICK_COLUMNS = [
+    'manager_id', 'gameweek', 'player_id', 'position',
+    'multiplier', 'is_captain', 'is_vice_captain'
+]
+PICK_DTYPES = {
+    'manager_id': 'int32', 'gameweek': 'int8', 'player_id': 'int16',
+    'position': 'int8', 'multiplier': 'int8',
+    'is_captain': 'bool', 'is_vice_captain': 'bool',
+    'player_name': 'category', 'player_team': 'category', 'player_position': 'category'
+}
+# Puntos reales de cada pick (event/{gw}/live/), unidos por jugador y jornada
+LIVE_DTYPES = {
+    'player_points': 'int16', 'minutes': 'int16', 'bonus': 'int8',
+    'effective_points': 'int16'
+}
+# Tabla manager-gameweek con enteros compactos (los rangos pueden faltar)
+# y los nombres, repetidos en cada gameweek, como categorías
+MANAGER_DTYPES = {
+    'manager_id': 'int32', 'manager_name': 'category', 'team_name': 'category',
+    'gameweek': 'int8', 'total_points': 'int32',
+    'gameweek_points': 'int16', 'transfers': 'int8', 'transfer_cost': 'int16',
+    'bank': 'int16', 'team_value': 'int16', 'wildcard_used': 'bool',
+    'overall_rank': 'Int32', 'rank': 'Int32'
+}
+# Registro de transferencias (entry/{id}/transfers/): una fila por fichaje,
+# unible a la tabla de managers por (manager_id, gameweek)
+TRANSFER_DTYPES = {
+    'manager_id': 'int32', 'gameweek': 'int8', 'player_in': 'int16', 'player_out': 'int16',
+    'price_in': 'int16', 'price_out': 'int16', 'time': 'datetime64[ns, UTC]'
+}
+
+def _retry_after(value):
+    """Segundos indicados por una cabecera Retry-After (entero o fecha)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _compact_managers(df):
+    """Aplica MANAGER_DTYPES (una liga vacía no tiene columnas)"""
+    return df.astype(MANAGER_DTYPES) if not df.empty else df
+
+def _write_arrow(df, path):
+    """Escribe un DataFrame como Arrow IPC sin comprimir, de forma atómica"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def _read_arrow(path):
+    """Lee un fichero Arrow IPC con memory-map
+
+    Las columnas numéricas sin nulos quedan como vistas (de solo lectura)
+    sobre el fichero mapeado, sin copiarse, y los diccionarios como
+    categorías.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def _build_page_chunk(entries, histories, raw_picks, transfers, since_gws):
+    """Etapa de construcción: una página de la clasificación como columnas
+
+    Recibe los historiales y transferencias ya decodificados y los picks
+    como JSON sin decodificar ({team_id: {gw: bytes}}), y devuelve (df,
+    picks, transfers, errors): la tabla manager-gameweek, la de alineaciones
+    (sin nombres de jugadores, que se unen una vez al final) y el registro
+    de transferencias construidos columna a columna, y los (team_id,
+    mensaje) de los managers que no se pudieron construir. Es una función
+    de módulo para poder ejecutarse en otro proceso.
+    """
+    managers = {column: [] for column in [
+        'manager_id', 'manager_name', 'team_name', 'gameweek', 'total_points',
+        'gameweek_points', 'transfers', 'transfer_cost', 'bank', 'team_value',
+        'wildcard_used', 'overall_rank', 'rank'
+    ]}
+    picks = {column: [] for column in PICK_COLUMNS}
+    moves = {column: [] for column in TRANSFER_DTYPES}
+    errors = []
+    for entry in entries:
+        team_id = entry['entry']
+        history = histories.get(team_id)
+        if not history or 'current' not in history:
+            continue
+        since_gw = since_gws.get(team_id)
+        try:
+            wildcards_used = {chip['event'] for chip in history.get('chips', []) if chip['name'] == 'wildcard'}
+            gameweeks = [gw for gw in history['current'] if since_gw is None or gw['event'] >= since_gw]
+            # Alineaciones de cada gameweek (decodificadas aquí, fuera de
+            # los hilos de red)
+            lineups = []
+            for gw in gameweeks:
+                body = raw_picks.get(team_id, {}).get(gw['event'])
+                data = json.loads(body) if body else None
+                lineups.append(data['picks'] if data and 'picks' in data else [])
+            # En orden cronológico (la API devuelve primero las más recientes)
+            team_moves = sorted(
+                (move for move in transfers.get(team_id) or []
+                 if since_gw is None or move['event'] >= since_gw),
+                key=lambda move: (move['event'], move['time'])
+            )
+        except Exception as e:
+            errors.append((team_id, str(e)))
+            continue
+
+        for column, key in [('gameweek', 'event'), ('total_points', 'total_points'),
+                            ('gameweek_points', 'points'), ('transfers', 'event_transfers'),
+                            ('transfer_cost', 'event_transfers_cost'), ('bank', 'bank'),
+                            ('team_value', 'value'), ('overall_rank', 'overall_rank'), ('rank', 'rank')]:
+            managers[column].extend(gw[key] for gw in gameweeks)
+        managers['manager_id'].extend([team_id] * len(gameweeks))
+        managers['manager_name'].extend([entry['player_name']] * len(gameweeks))
+        managers['team_name'].extend([entry['entry_name']] * len(gameweeks))
+        managers['wildcard_used'].extend(gw['event'] in wildcards_used for gw in gameweeks)
+
+        for gw, lineup in zip(gameweeks, lineups):
+            picks['manager_id'].extend([team_id] * len(lineup))
+            picks['gameweek'].extend([gw['event']] * len(lineup))
+            for column, key in [('player_id', 'element'), ('position', 'position'),
+                                ('multiplier', 'multiplier'), ('is_captain', 'is_captain'),
+                                ('is_vice_captain', 'is_vice_captain')]:
+                picks[column].extend(pick[key] for pick in lineup)
+
+        moves['manager_id'].extend([team_id] * len(team_moves))
+        for column, key in [('gameweek', 'event'), ('player_in', 'element_in'),
+                            ('player_out', 'element_out'), ('price_in', 'element_in_cost'),
+                            ('price_out', 'element_out_cost'), ('time', 'time')]:
+            moves[column].extend(move[key] for move in team_moves)
+
+    df = pd.DataFrame(managers)
+    picks = pd.DataFrame(picks).astype({column: PICK_DTYPES[column] for column in PICK_COLUMNS})
+    moves['time'] = pd.to_datetime(moves['time'], utc=True, format='ISO8601')
+    moves = pd.DataFrame(moves).astype(TRANSFER_DTYPES)
+    return df, picks, moves, errors
+
+class FPLData:
+    def __init__(self, max_workers=8, requests_per_second=10, cache_path=None,
+                 base_url="https://fantasy.premierleague.com/api/", build_processes=None):
+        self.session = requests.session()
+        # Un pool acotado de conexiones, una por hilo de descarga
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.base_url = base_url
+        # (clave, datos) y (instante, datos): se reemplazan como una sola
+        # referencia, así ningún hilo ve la clave de un payload y los datos
+        # de otro
+        self.general_data = (None, None)
+        self.event_status = (None, None)
+        self.max_workers = max_workers
+        self.build_processes = build_processes or min(os.cpu_count() or 1, 4)
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.breaker = CircuitBreaker()
+        self.inflight = SingleFlight()
+        self.cache = HTTPCache(cache_path) if cache_path else None
+        self.leagues = {}  # league_id -> último DataFrame construido
+        self.transfers = {}  # league_id -> registro de transferencias
+        self.league_names = {}  # league_id -> nombre, de la clasificación
+        self.metrics = Metrics()
+
+    def _get(self, url, ttl=LIVE_TTL, key=None, raw=False):
+        """Hace una petición GET pasando por la caché persistente
+
+        ttl=None guarda la respuesta para siempre; key permite versionar
+        la entrada (por defecto se usa la URL). Con raw=True se devuelve el
+        cuerpo sin decodificar, para decodificarlo en la etapa de
+        construcción.
+        """
+        key = key or url
+        endpoint = endpoint_name(url[len(self.base_url):])
+        if self.cache is not None:
+            start = time.perf_counter()
+            body = self.cache.get(key)
+            if body is not None:
+                latency = time.perf_counter() - start
+                data = body if raw else json.loads(body)
+                self.metrics.record_request(
+                    endpoint, latency, len(body), time.perf_counter() - start - latency, cache_hit=True
+                )
+                return data
+
+        # Las peticiones idénticas simultáneas (varios usuarios del
+        # dashboard, varias ligas) comparten una sola descarga
+        return self.inflight.do((key, raw), lambda: self._download(url, ttl, key, endpoint, raw))
+
+    def _download(self, url, ttl, key, endpoint, raw=False):
+        """Descarga una URL, la guarda en la caché y registra sus métricas"""
+        start = time.perf_counter()
+        try:
+            r, retries = self._request(url)
+        except FPLAPIError:
+            self.metrics.record_request(endpoint, time.perf_counter() - start, 0, 0.0, error=True)
+            raise
+        latency = time.perf_counter() - start
+        if self.cache is not None:
+            self.cache.set(key, r.content, ttl)
+        start = time.perf_counter()
+        data = r.content if raw else r.json()
+        self.metrics.record_request(
+            endpoint, latency, len(r.content), time.perf_counter() - start, retries=retries
+        )
+        return data
+
+    def _request(self, url):
+        """GET con timeouts, reintentos con backoff exponencial y jitter
+        (respetando Retry-After) y circuit breaker
+
+        Devuelve (respuesta, reintentos). Lanza FPLAPIError si la respuesta
+        no es 200 tras agotar los reintentos (o si el breaker se abre entre
+        dos intentos), o CircuitOpenError sin intentarlo si la API está
+        caída.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                # Si ya hubo un intento real, su fallo es el resultado: la
+                # petición sí se intentó
+                if attempt == 0:
+                    raise
+                raise error
+            self.rate_limiter.acquire()
+            retry_after = None
+            try:
+                r = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                error = FPLAPIError(f"{url}: {e}")
+            except BaseException:
+                # Cualquier otro error también cierra la petición de prueba
+                # del breaker; si no, se quedaría semiabierto para siempre
+                self.breaker.record_failure()
+                raise
+            else:
+                if r.status_code == 200:
+                    self.breaker.record_success()
+                    return r, attempt
+                error = FPLAPIError(f"{url}: HTTP {r.status_code}")
+                if r.status_code not in RETRY_STATUS:
+                    # Un 404 no es un fallo de la API: el breaker lo cuenta
+                    # como respuesta válida
+                    self.breaker.record_success()
+                    raise error
+                retry_after = _retry_after(r.headers.get('Retry-After'))
+            self.breaker.record_failure()
+            if attempt == MAX_RETRIES:
+                raise error
+            backoff = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            time.sleep(max(backoff, retry_after or 0))
+
+    def _current_event(self):
+        """Id de la gameweek en curso (o la última si no hay ninguna activa)"""
+        events = self.get_general_data()['events']
+        current = [event['id'] for event in events if event['is_current']]
+        return current[0] if current else max(event['id'] for event in events)
+
+    def _gameweek_ttl(self, gameweek):
+        """Las gameweeks terminadas no cambian: se guardan para siempre"""
+        for event in self.get_general_data()['events']:
+            if event['id'] == gameweek:
+                return None if event['finished'] and event['data_checked'] else LIVE_TTL
+        return LIVE_TTL
+
+    # Primero, añadamos un método para obtener el nombre de la liga
+    def get_league_info(self,league_id):
+        """Obtiene información básica de la liga"""
+        url = f"{self.base_url}leagues-classic/{league_id}/"
+        return self._get(url)
+
+    def gln(self,lid):
+        return self.get_league_info(lid)['name']
+    '''
+    def get_league_name(self, league_id):
+        """Obtiene nombre de la liga"""
+        league_info = 
+        return league_info['name']
+    '''
+    def get_event_status(self):
+        """Obtiene el estado de actualización de la gameweek en curso"""
+        fetched_at, status = self.event_status
+        if status is None or time.monotonic() - fetched_at > LIVE_TTL:
+            status = self._get(f"{self.base_url}event-status/")
+            self.event_status = (time.monotonic(), status)
+        return status
+
+    def get_general_data(self):
+        """Obtiene datos generales de la FPL
+
+        La entrada de caché se versiona con el estado de la gameweek, de modo
+        que cualquier cambio de estado fuerza una descarga nueva.
+        """
+        url = f"{self.base_url}bootstrap-static/"
+        status = json.dumps(self.get_event_status(), sort_keys=True)
+        key = f"{url}#{hashlib.sha1(status.encode()).hexdigest()[:12]}"
+        cached_key, data = self.general_data
+        if cached_key != key:
+            data = self._get(url, ttl=BOOTSTRAP_TTL, key=key)
+            self.general_data = (key, data)
+        return data
+    
+    def get_league_standings(self, league_id, page=1):
+        """Obtiene la clasificación de una liga"""
+        url = f"{self.base_url}leagues-classic/{league_id}/standings/?page_standings={page}"
+        return self._get(url)
+    
+    def get_manager_history(self, team_id):
+        """Obtiene el historial de un manager"""
+        # Solo cambia mientras la gameweek en curso no haya terminado
+        current = self._current_event()
+        url = f"{self.base_url}entry/{team_id}/history/"
+        return self._get(url, ttl=self._gameweek_ttl(current), key=f"{url}#gw{current}")
+    
+    def get_manager_transfers(self, team_id):
+        """Obtiene todas las transferencias de un manager en la temporada
+        (una sola petición, no una por gameweek)"""
+        current = self._current_event()
+        url = f"{self.base_url}entry/{team_id}/transfers/"
+        return self._get(url, ttl=self._gameweek_ttl(current), key=f"{url}#gw{current}")
+
+    def get_team_picks(self, team_id, gameweek, raw=False):
+        """Obtiene las selecciones de un equipo para una gameweek (con
+        raw=True, el JSON sin decodificar)"""
+        url = f"{self.base_url}entry/{team_id}/event/{gameweek}/picks/"
+        return self._get(url, ttl=self._gameweek_ttl(gameweek), raw=raw)
+    
+    def get_event_live(self, gameweek):
+        """Obtiene las estadísticas en vivo de todos los jugadores en una
+        gameweek (puntos, minutos, bonus...)"""
+        url = f"{self.base_url}event/{gameweek}/live/"
+        return self._get(url, ttl=self._gameweek_ttl(gameweek))
+
+    def get_player_details(self, player_id):
+        """Obtiene detalles de un jugador"""
+        current = self._current_event()
+        url = f"{self.base_url}element-summary/{player_id}/"
+        return self._get(url, ttl=self._gameweek_ttl(current), key=f"{url}#gw{current}")
+   
+    def _build_player_lookup(self, general_data):
+        """Tabla de jugadores indexada por id: nombre, equipo y posición
+
+        Se construye una vez por carga a partir de bootstrap-static para
+        resolver las alineaciones con un join en lugar de buscar cada pick.
+        """
+        players = pd.DataFrame(general_data['elements']).set_index('id')
+        team_names = {team['id']: team['name'] for team in general_data['teams']}
+        positions = {kind['id']: kind['singular_name_short'] for kind in general_data['element_types']}
+        return pd.DataFrame({
+            'player_name': players['first_name'] + ' ' + players['second_name'],
+            'player_team': players['team'].map(team_names),
+            'player_position': players['element_type'].map(positions),
+        })
+
+    def _build_picks_table(self, picks, player_lookup):
+        """Tabla larga de picks tipada, con los nombres resueltos en un
+        único join contra la tabla de jugadores"""
+        picks = picks.join(player_lookup, on='player_id')
+        return picks.astype(PICK_DTYPES)
+
+    def _build_live_table(self, gameweek, live):
+        """Puntos, minutos y bonus de cada jugador en una gameweek"""
+        elements = live.get('elements', []) if live else []
+        stats = [element['stats'] for element in elements]
+        return pd.DataFrame({
+            'player_id': np.array([element['id'] for element in elements], dtype=np.int16),
+            'gameweek': np.full(len(elements), gameweek, dtype=np.int8),
+            'player_points': np.array([stat.get('total_points', 0) for stat in stats], dtype=np.int16),
+            'minutes': np.array([stat.get('minutes', 0) for stat in stats], dtype=np.int16),
+            'bonus': np.array([stat.get('bonus', 0) for stat in stats], dtype=np.int8),
+        })
+
+    def _live_tables(self, gameweeks, warn=None):
+        """Live de varias gameweeks (en paralelo) como una sola tabla"""
+        warn = warn or logger.warning
+        tables = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {gw: executor.submit(self.get_event_live, gw) for gw in sorted(gameweeks)}
+            for gw, future in futures.items():
+                try:
+                    tables.append(self._build_live_table(gw, future.result()))
+                except Exception as e:
+                    warn(f"Error obteniendo los puntos de la gameweek {gw}: {str(e)}")
+        return pd.concat(tables, ignore_index=True) if tables else self._build_live_table(0, None)
+
+    def get_player_points(self, gameweeks, warn=None):
+        """Puntos de todos los jugadores como matriz densa jugadores ×
+        gameweeks, indexada por player_id y por la posición en gameweeks"""
+        gameweeks = np.asarray(gameweeks)
+        live = self._live_tables(gameweeks.tolist(), warn)
+        players = int(live['player_id'].max()) + 1 if len(live) else 1
+        points = np.zeros((players, len(gameweeks)), dtype=np.int16)
+        points[live['player_id'].to_numpy(), np.searchsorted(gameweeks, live['gameweek'].to_numpy())] = \
+            live['player_points'].to_numpy()
+        return points
+
+    def _enrich_picks(self, picks, warn=None):
+        """Añade a los picks los puntos reales de cada jugador
+
+        Se descarga una sola vez el live de cada gameweek presente (en
+        paralelo) y se une por (player_id, gameweek): una petición por
+        jornada en lugar de una por jugador. effective_points aplica el
+        multiplicador del pick (capitán x2/x3, banquillo x0).
+        """
+        live = self._live_tables(picks['gameweek'].unique().tolist(), warn)
+        picks = picks.drop(columns=list(LIVE_DTYPES), errors='ignore')
+        picks = picks.merge(live, on=['player_id', 'gameweek'], how='left')
+        picks[['player_points', 'minutes', 'bonus']] = picks[['player_points', 'minutes', 'bonus']].fillna(0)
+        picks['effective_points'] = picks['player_points'] * picks['multiplier']
+        return picks.astype(LIVE_DTYPES)
+
+    # Y modifiquemos el process_league_data para incluir más detalles
+    def process_league_data(self, league_id, progress=None, warn=None):
+        """Construye desde cero los datos de la liga y los guarda
+
+        Devuelve (df, picks): la tabla manager-gameweek y la tabla larga de
+        alineaciones, unibles por (manager_id, gameweek). El registro de
+        transferencias queda en self.transfers[league_id]. progress recibe la
+        fracción completada y warn los avisos (por defecto van al log).
+        """
+        result = self._process_league(league_id, progress=progress, warn=warn)
+        if result is None:
+            return None
+        df, picks, transfers, _, _ = result
+        self.leagues[league_id] = (df, picks)
+        self.transfers[league_id] = transfers
+        return df, picks
+
+    def refresh_league(self, league_id, since_gw=None, reuse=(), fresh=(), progress=None, warn=None):
+        """Actualiza incrementalmente los datos guardados de una liga
+
+        Solo se descargan las alineaciones de las gameweeks >= since_gw (por
+        defecto, la última guardada) y se reemplazan esas filas en las
+        tablas anteriores. Los managers que ya están cargados en otra liga
+        se tratan igual que los propios, y los de reuse (ya actualizados en
+        otra liga) no se piden, así que una liga nueva solo cuesta sus
+        miembros nuevos: sus filas se toman de las ligas de fresh, las ya
+        actualizadas en esta pasada. Sin datos previos equivale a
+        process_league_data.
+        """
+        known_rows = self._known_rows(league_id, fresh)
+        if known_rows is None:
+            return self.process_league_data(league_id, progress=progress, warn=warn)
+        previous_df, previous_picks, previous_transfers, last_gw = known_rows
+        if since_gw is None:
+            since_gw = last_gw
+
+        known = set(previous_df['manager_id'])
+        result = self._process_league(
+            league_id, since_gw=since_gw, known=known, reuse=known & set(reuse),
+            progress=progress, warn=warn
+        )
+        if result is None:
+            return self.leagues.get(league_id)
+        new_df, new_picks, new_transfers, entries, failed = result
+
+        # Filas anteriores que se conservan: gameweeks pasadas de managers
+        # que siguen en la liga, y todo lo de los que fallaron ahora
+        order = {entry['entry']: i for i, entry in enumerate(entries)}
+
+        def merge(old, new, sort_keys):
+            members = old['manager_id'].isin(order)
+            keep = members & ((old['gameweek'] < since_gw) | old['manager_id'].isin(failed))
+            merged = pd.concat([old[keep], new], ignore_index=True)
+            keys = [merged[key] for key in reversed(sort_keys)] + [merged['manager_id'].map(order)]
+            return merged.iloc[np.lexsort(keys)].reset_index(drop=True)
+
+        # Mismo orden y nombres que tendría una carga completa
+        df = merge(previous_df, new_df, ['gameweek'])
+        df['manager_name'] = df['manager_id'].map({e['entry']: e['player_name'] for e in entries})
+        df['team_name'] = df['manager_id'].map({e['entry']: e['entry_name'] for e in entries})
+        df = _compact_managers(df)
+        picks = merge(previous_picks, new_picks, ['gameweek', 'position']).astype(PICK_DTYPES)
+        transfers = merge(previous_transfers, new_transfers, ['gameweek', 'time']).astype(TRANSFER_DTYPES)
+
+        self.leagues[league_id] = (df, picks)
+        self.transfers[league_id] = transfers
+        return df, picks
+
+    def refresh_leagues(self, league_ids, progress=None, warn=None):
+        """Actualiza varias ligas una tras otra
+
+        Las ligas se procesan en orden para que cada una reutilice los
+        managers ya cargados por las anteriores: un manager que está en
+        varias ligas solo se descarga una vez. Devuelve {league_id: (df,
+        picks)} con las ligas que se pudieron cargar.
+        """
+        progress = progress or (lambda fraction: None)
+        results = {}
+        refreshed = set()
+        for i, league_id in enumerate(league_ids):
+            result = self.refresh_league(
+                league_id, reuse=refreshed, fresh=list(results), warn=warn,
+                progress=lambda fraction, i=i: progress((i + fraction) / len(league_ids))
+            )
+            if result is not None:
+                results[league_id] = result
+                refreshed.update(result[0]['manager_id'].tolist())
+        return results
+
+    def live_gameweek(self):
+        """Id de la gameweek en juego, o None si la última ya está cerrada"""
+        current = self._current_event()
+        return current if self._gameweek_ttl(current) is not None else None
+
+    def refresh_live(self, league_id, warn=None):
+        """Actualiza los puntos provisionales de la gameweek en juego
+
+        Con el live de la gameweek (una sola petición, compartida por todas
+        las ligas) se recalculan los puntos de los picks ya guardados de esa
+        jornada y, a partir de ellos, gameweek_points y total_points de sus
+        filas. El resto de filas no se toca: solo se copian las columnas que
+        cambian, así que los snapshots anteriores siguen siendo válidos.
+        Los puntos son provisionales (sin cambios automáticos) hasta el
+        siguiente refresco completo. Devuelve (df, picks), o None si no hay
+        gameweek en juego, la liga no tiene alineaciones de ella o nada ha
+        cambiado desde la última actualización (así no se publica un
+        snapshot idéntico en cada sondeo).
+        """
+        warn = warn or logger.warning
+        gameweek = self.live_gameweek()
+        tables = self.leagues.get(league_id)
+        if gameweek is None or tables is None:
+            return None
+        df, picks = tables
+        in_gw = picks['gameweek'].to_numpy() == gameweek
+        if not in_gw.any():
+            return None
+        try:
+            live = self._build_live_table(gameweek, self.get_event_live(gameweek))
+        except Exception as e:
+            warn(f"Error obteniendo el live de la gameweek {gameweek}: {str(e)}")
+            return None
+
+        # Estadísticas por id de jugador en arrays densos: un indexado por
+        # columna en lugar de un merge
+        player_ids = picks['player_id'].to_numpy()[in_gw].astype(np.intp)
+        size = max(int(player_ids.max()), int(live['player_id'].max()) if len(live) else 0) + 1
+        updated = {}
+        for column in ('player_points', 'minutes', 'bonus'):
+            by_player = np.zeros(size, dtype=LIVE_DTYPES[column])
+            by_player[live['player_id'].to_numpy()] = live[column].to_numpy()
+            values = picks[column].to_numpy()
+            if not np.array_equal(values[in_gw], by_player[player_ids]):
+                values = values.copy()
+                values[in_gw] = by_player[player_ids]
+                updated[column] = values
+        if not updated:
+            # Los puntos de la jornada salen de estas columnas: sin cambios
+            return None
+        picks = picks.copy(deep=False)
+        for column, values in updated.items():
+            picks[column] = values
+        effective = picks['effective_points'].to_numpy().copy()
+        effective[in_gw] = picks['player_points'].to_numpy()[in_gw] * picks['multiplier'].to_numpy()[in_gw]
+        picks['effective_points'] = effective
+
+        # Puntos de la jornada por manager y su diferencia con los guardados
+        managers, codes = np.unique(picks['manager_id'].to_numpy()[in_gw], return_inverse=True)
+        points = np.bincount(codes, weights=effective[in_gw]).astype(np.int64)
+        rows = np.flatnonzero(df['gameweek'].to_numpy() == gameweek)
+        index = pd.Index(managers).get_indexer(df['manager_id'].to_numpy()[rows])
+        rows, index = rows[index >= 0], index[index >= 0]
+        df = df.copy(deep=False)
+        gameweek_points = df['gameweek_points'].to_numpy().copy()
+        total_points = df['total_points'].to_numpy().copy()
+        total_points[rows] += points[index] - gameweek_points[rows]
+        gameweek_points[rows] = points[index]
+        df['gameweek_points'] = gameweek_points
+        df['total_points'] = total_points
+
+        self.leagues[league_id] = (df, picks)
+        return df, picks
+
+    def _known_rows(self, league_id, fresh=()):
+        """Filas ya construidas que puede reutilizar una liga
+
+        Devuelve (df, picks, transfers, last_gw): las filas guardadas de la
+        liga más las de los managers que solo aparecen en otras ligas
+        cargadas (cada manager se toma de una sola liga: primero de las de
+        fresh, recién actualizadas, después de la propia). last_gw es la
+        gameweek más antigua entre las últimas de cada liga usada, para que
+        ningún manager se quede con jornadas sin descargar, o 1 si alguna
+        aún no tiene registro de transferencias (snapshot anterior a él): se
+        reconstruye entera, con las gameweeks terminadas desde la caché.
+        None si no hay nada.
+        """
+        sources = []
+        seen = set()
+        complete = True
+        # Primero las ligas recién actualizadas, en su orden, después la
+        # propia y por último las demás
+        fresh = list(fresh)
+
+        def priority(item):
+            other_id = item[0]
+            if other_id in fresh:
+                return 0, fresh.index(other_id)
+            return (1, 0) if other_id == league_id else (2, 0)
+
+        for other_id, (df, picks) in sorted(self.leagues.items(), key=priority):
+            if df.empty:
+                continue
+            ids = df['manager_id'].unique()
+            new_ids = ids[~np.isin(ids, list(seen))]
+            if len(new_ids) == 0:
+                continue
+            transfers = self.transfers.get(other_id)
+            if transfers is None:
+                complete = False
+                transfers = pd.DataFrame(columns=list(TRANSFER_DTYPES)).astype(TRANSFER_DTYPES)
+            if len(new_ids) < len(ids):
+                df = df[df['manager_id'].isin(new_ids)]
+                picks = picks[picks['manager_id'].isin(new_ids)]
+                transfers = transfers[transfers['manager_id'].isin(new_ids)]
+            seen.update(new_ids.tolist())
+            sources.append((df, picks, transfers))
+        if not sources:
+            return None
+        last_gw = min(df['gameweek'].max() for df, _, _ in sources) if complete else 1
+        if len(sources) == 1:
+            return sources[0] + (last_gw,)
+        df = _compact_managers(pd.concat([df for df, _, _ in sources], ignore_index=True))
+        picks = pd.concat([picks for _, picks, _ in sources], ignore_index=True).astype(PICK_DTYPES)
+        transfers = pd.concat([transfers for _, _, transfers in sources], ignore_index=True)
+        return df, picks, transfers.astype(TRANSFER_DTYPES), last_gw
+
+    def save_snapshot(self, league_id, directory):
+        """Guarda las tablas de una liga en directory/<league_id>/
+
+        Se usa Arrow IPC sin comprimir (los nombres, categorías, como
+        diccionario), de modo que load_snapshot puede abrirlas con memory-map.
+        Las tablas se escriben con nombres nuevos y después se reemplaza de
+        una vez manifest.json, que dice cuáles forman el snapshot: un error a
+        medias deja el snapshot anterior entero.
+        """
+        df, picks = self.leagues[league_id]
+        target = os.path.join(directory, str(league_id))
+        os.makedirs(target, exist_ok=True)
+        version = f"{time.time_ns():x}"
+        tables = {'managers': df, 'picks': picks}
+        if league_id in self.transfers:
+            tables['transfers'] = self.transfers[league_id]
+        files = {}
+        for table, data in tables.items():
+            files[table] = f"{table}-{version}.arrow"
+            _write_arrow(data, os.path.join(target, files[table]))
+        manifest_path = os.path.join(target, 'manifest.json')
+        with open(f"{manifest_path}.tmp", 'w') as f:
+            json.dump({'files': files, 'name': self.league_names.get(league_id)}, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        # Las tablas de snapshots anteriores ya no se usan
+        for name in os.listdir(target):
+            if name.endswith('.arrow') and name not in files.values():
+                try:
+                    os.remove(os.path.join(target, name))
+                except OSError:
+                    pass
+
+    def load_snapshot(self, league_id, directory):
+        """Carga un snapshot guardado con save_snapshot
+
+        Las tablas quedan como estado de la liga, así que un refresh_league
+        posterior solo descarga las gameweeks nuevas. No hace peticiones.
+        Devuelve (df, picks) o None si no hay snapshot o es anterior a los
+        puntos por jugador (la liga se reconstruye en el siguiente refresco).
+        """
+        target = os.path.join(directory, str(league_id))
+        manifest_path = os.path.join(target, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        elif os.path.exists(os.path.join(target, 'picks.arrow')):
+            # Snapshot anterior al manifiesto
+            manifest = {'files': {
+                table: f"{table}.arrow" for table in ('managers', 'picks', 'transfers')
+                if os.path.exists(os.path.join(target, f"{table}.arrow"))
+            }}
+        else:
+            return None
+        files = {table: os.path.join(target, name) for table, name in manifest['files'].items()}
+        picks = _read_arrow(files['picks'])
+        if not set(LIVE_DTYPES) <= set(picks.columns):
+            return None
+        df = _read_arrow(files['managers'])
+        self.leagues[league_id] = (df, picks)
+        if manifest.get('name'):
+            self.league_names[league_id] = manifest['name']
+        # Sin registro de transferencias (snapshot anterior a él), el
+        # siguiente refresh_league reconstruye la liga entera
+        self.transfers.pop(league_id, None)
+        if 'transfers' in files:
+            self.transfers[league_id] = _read_arrow(files['transfers'])
+        return df, picks
+
+    def _process_league(self, league_id, since_gw=None, known=(), reuse=(), progress=None, warn=None):
+        """Descarga y construye las filas de una liga
+
+        Para los managers en known solo se piden las gameweeks >= since_gw;
+        los de reuse no se piden (sus filas ya están al día). Devuelve (df,
+        picks, transfers, entries, failed) o None si no hay clasificación;
+        failed incluye los managers de reuse, cuyas filas anteriores se
+        conservan.
+        """
+        progress = progress or (lambda fraction: None)
+        warn = warn or logger.warning
+        
+        # Obtener datos generales
+        general_data = self.get_general_data()
+        player_lookup = self._build_player_lookup(general_data)
+        
+        # Obtener datos de la liga
+        def standings(data):
+            # Resultados de una página y si hay más detrás
+            if not data or 'standings' not in data:
+                return None, False
+            return data['standings']['results'], bool(data['standings'].get('has_next'))
+        
+        first = self.get_league_standings(league_id)
+        first_page, more_pages = standings(first)
+        if first_page is not None and first.get('league', {}).get('name'):
+            self.league_names[league_id] = first['league']['name']
+        next_page = 2
+        
+        if first_page is None:
+            warn("No se pudieron obtener los datos de la liga")
+            return None
+            
+        entries = []
+        chunks = {}          # página -> (df, picks) ya construidos
+        builds = {}          # página -> construcción en curso
+        page_entries = {}    # página -> managers de la página en proceso
+        page_remaining = {}  # página -> managers sin terminar
+        page_of = {}
+        histories = {}
+        picks = {}
+        transfers = {}
+        pending = {}
+        failed = set()
+        deferred = []        # (team_id, gameweek) que fallaron una vez
+        retried = set()
+        done = 0
+        page_wanted = False
+        
+        def first_gw(team_id):
+            return since_gw if team_id in known else None
+        
+        # Las peticiones se reparten en un pool de hilos; el rate limit lo
+        # impone el token bucket compartido en lugar de un sleep fijo.
+        # max_workers=1 equivale al modo secuencial. Cada página descargada
+        # pasa a la etapa de construcción (decodificación de los picks y
+        # tablas por columnas), que corre en paralelo a las descargas: en un
+        # hilo aparte o, en ligas grandes, en un pool de procesos.
+        with ExitStack() as stack:
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.max_workers))
+            builders = [stack.enter_context(ThreadPoolExecutor(max_workers=1))]
+            futures = {}
+            
+            def builder():
+                if len(builders) == 1 and self.build_processes > 1 and len(entries) >= BUILD_PROCESS_MIN:
+                    # spawn y no fork: los hilos de descarga siguen activos
+                    builders.append(stack.enter_context(ProcessPoolExecutor(
+                        max_workers=self.build_processes, mp_context=multiprocessing.get_context('spawn')
+                    )))
+                return builders[-1]
+            
+            def collect_build(index):
+                df, picks_chunk, transfers_chunk, errors = builds.pop(index).result()
+                for team_id, message in errors:
+                    warn(f"Error obteniendo datos para el equipo {team_id}: {message}")
+                    failed.add(team_id)
+                chunks[index] = (df, picks_chunk, transfers_chunk)
+            
+            def fetch_page(number):
+                # Las páginas de la clasificación se piden de a una
+                futures[executor.submit(self.get_league_standings, league_id, number)] = (None, number)
+            
+            def fetch_next_page():
+                nonlocal next_page
+                fetch_page(next_page)
+                next_page += 1
+            
+            def submit(team_id, gameweek):
+                if gameweek is None:
+                    future = executor.submit(self.get_manager_history, team_id)
+                elif gameweek == TRANSFERS:
+                    future = executor.submit(self.get_manager_transfers, team_id)
+                else:
+                    future = executor.submit(self.get_team_picks, team_id, gameweek, raw=True)
+                futures[future] = (team_id, gameweek)
+            
+            def start_page(results):
+                nonlocal page_wanted, done
+                index = len(page_entries) + len(builds) + len(chunks)
+                page_entries[index] = results
+                page_remaining[index] = 0
+                entries.extend(results)
+                for team in results:
+                    if team['entry'] in reuse:
+                        # Ya actualizado en esta pasada: se conservan sus filas
+                        failed.add(team['entry'])
+                        done += 1
+                        continue
+                    page_of[team['entry']] = index
+                    page_remaining[index] += 1
+                    picks[team['entry']] = {}
+                    # Historial y transferencias; las alineaciones se piden
+                    # cuando llega el historial
+                    pending[team['entry']] = 2
+                    submit(team['entry'], None)
+                    submit(team['entry'], TRANSFERS)
+                # Se piden páginas por adelantado mientras se procesan
+                # las anteriores, con un máximo de páginas en memoria
+                if more_pages:
+                    if len(page_entries) < STANDINGS_PAGES_AHEAD:
+                        fetch_next_page()
+                    else:
+                        page_wanted = True
+                if page_remaining[index] == 0:
+                    finish_page(index)
+            
+            def finish_page(index):
+                nonlocal page_wanted
+                # Cola acotada: si hay demasiadas páginas esperando a
+                # construirse, se espera a la más antigua
+                while len(builds) >= BUILD_QUEUE_SIZE:
+                    collect_build(min(builds))
+                page = page_entries.pop(index)
+                team_ids = [entry['entry'] for entry in page]
+                page_histories = {team_id: histories.pop(team_id, None) for team_id in team_ids}
+                page_picks = {team_id: picks.pop(team_id, {}) for team_id in team_ids}
+                page_transfers = {team_id: transfers.pop(team_id, None) for team_id in team_ids}
+                page = [entry for entry in page if entry['entry'] not in failed]
+                builds[index] = builder().submit(
+                    _build_page_chunk, page, page_histories, page_picks, page_transfers,
+                    {entry['entry']: first_gw(entry['entry']) for entry in page},
+                )
+                if page_wanted:
+                    page_wanted = False
+                    fetch_next_page()
+            
+            def finish_manager(team_id):
+                nonlocal done
+                done += 1
+                # Total estimado: aún no se conocen las páginas restantes
+                total = len(entries) + (STANDINGS_PAGE_SIZE if more_pages else 0)
+                progress(min(done / total, 1.0))
+                index = page_of[team_id]
+                page_remaining[index] -= 1
+                if page_remaining[index] == 0:
+                    finish_page(index)
+            
+            def fail_deferred():
+                nonlocal more_pages, page_wanted
+                # La API sigue caída: se renuncia a lo pendiente y se
+                # conservan los resultados parciales
+                for team_id, _ in deferred:
+                    if team_id is None:
+                        warn("Error obteniendo la clasificación: la API de la FPL no responde")
+                        more_pages = False
+                        page_wanted = False
+                    elif team_id not in failed:
+                        warn(f"Error obteniendo datos para el equipo {team_id}: la API de la FPL no responde")
+                        failed.add(team_id)
+                        finish_manager(team_id)
+                deferred.clear()
+            
+            start_page(first_page)
+            deadline = None
+            while futures or deferred:
+                if not futures:
+                    # Lo demás ya terminó: se reintentan una vez las peticiones
+                    # fallidas. Con el circuit breaker abierto, tras su espera
+                    # solo pasa una petición de prueba, así que se manda esa
+                    # primero y el resto cuando el circuito se haya cerrado.
+                    # La pasada dura como mucho DEFERRED_TIMEOUT segundos
+                    if deadline is None:
+                        deadline = time.monotonic() + DEFERRED_TIMEOUT
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or (self.breaker.is_open() and self.breaker.wait_time() > remaining):
+                        fail_deferred()
+                        continue
+                    if self.breaker.is_open():
+                        time.sleep(max(self.breaker.wait_time(), BACKOFF_BASE))
+                    batch = deferred[:1] if self.breaker.is_open() else list(deferred)
+                    del deferred[:len(batch)]
+                    for team_id, gameweek in batch:
+                        retried.add((team_id, gameweek))
+                        if team_id is None:
+                            fetch_page(gameweek)
+                        else:
+                            submit(team_id, gameweek)
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    team_id, gameweek = futures.pop(future)
+                    if team_id is None:
+                        # Nueva página de la clasificación
+                        try:
+                            results, more_pages = standings(future.result())
+                        except CircuitOpenError as e:
+                            logger.info("Reintento diferido para la página %s: %s", gameweek, e)
+                            deferred.append((team_id, gameweek))
+                            continue
+                        except Exception as e:
+                            warn(f"Error obteniendo la clasificación: {str(e)}")
+                            results, more_pages = None, False
+                        if results is None:
+                            page_wanted = False
+                        else:
+                            start_page(results)
+                        continue
+                    if team_id in failed:
+                        continue
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        # Rechazada por el breaker sin llegar a intentarse: no
+                        # gasta el reintento
+                        if (team_id, gameweek) not in retried or isinstance(e, CircuitOpenError):
+                            logger.info("Reintento diferido para el equipo %s: %s", team_id, e)
+                            deferred.append((team_id, gameweek))
+                            continue
+                        warn(f"Error obteniendo datos para el equipo {team_id}: {str(e)}")
+                        failed.add(team_id)
+                        finish_manager(team_id)
+                        if self.breaker.is_open():
+                            fail_deferred()
+                        continue
+                    
+                    if gameweek is None:
+                        # Historial listo: pedir la alineación de cada gameweek
+                        histories[team_id] = data
+                        gameweeks = [gw['event'] for gw in data['current']] if data and 'current' in data else []
+                        if first_gw(team_id) is not None:
+                            gameweeks = [gw for gw in gameweeks if gw >= first_gw(team_id)]
+                        pending[team_id] += len(gameweeks) - 1
+                        for gw in gameweeks:
+                            submit(team_id, gw)
+                    elif gameweek == TRANSFERS:
+                        transfers[team_id] = data
+                        pending[team_id] -= 1
+                    else:
+                        picks[team_id][gameweek] = data
+                        pending[team_id] -= 1
+                    
+                    if pending[team_id] == 0:
+                        finish_manager(team_id)
+            
+            with self.metrics.timed('FPLData: construcción de páginas'):
+                for index in sorted(builds):
+                    collect_build(index)
+        
+        # Los bloques por página se concatenan una sola vez, en el orden de
+        # la clasificación, y los nombres de los jugadores se unen una vez
+        ordered = [chunks[index] for index in sorted(chunks)]
+        df = _compact_managers(pd.concat([chunk[0] for chunk in ordered], ignore_index=True))
+        picks_df = pd.concat([chunk[1] for chunk in ordered], ignore_index=True)
+        picks_df = self._enrich_picks(self._build_picks_table(picks_df, player_lookup), warn)
+        transfers_df = pd.concat([chunk[2] for chunk in ordered], ignore_index=True).astype(TRANSFER_DTYPES)
+        
+        return df, picks_df, transfers_df, entries, failed
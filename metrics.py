@@ -0,0 +1,115 @@
+"""Métricas internas de rendimiento
+
+Registra por endpoint de la API latencias, bytes, reintentos y aciertos de
+caché, y por sección del dashboard el tiempo de render. Cada petición se
+emite además como una línea JSON en el logger "fpl.metrics" (nivel DEBUG).
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("fpl.metrics")
+
+def endpoint_name(path):
+    """Plantilla del endpoint: entry/123/event/5/picks/ -> entry/{id}/event/{id}/picks/"""
+    return re.sub(r'\d+', '{id}', path.split('?')[0])
+
+class Metrics:
+    """Contadores de rendimiento compartidos entre hilos"""
+    def __init__(self, max_samples=5000):
+        self.lock = threading.Lock()
+        self.max_samples = max_samples
+        self.endpoints = defaultdict(self._new_endpoint)
+        self.sections = defaultdict(lambda: deque(maxlen=self.max_samples))
+
+    def _new_endpoint(self):
+        return {
+            'latencies': deque(maxlen=self.max_samples),
+            'requests': 0, 'cache_hits': 0, 'errors': 0, 'retries': 0,
+            'bytes': 0, 'decode_s': 0.0,
+        }
+
+    def record_request(self, endpoint, latency, nbytes, decode_s, cache_hit=False, retries=0, error=False):
+        """Registra una petición (o lectura de caché) a un endpoint"""
+        with self.lock:
+            stats = self.endpoints[endpoint]
+            stats['latencies'].append(latency)
+            stats['requests'] += 1
+            stats['cache_hits'] += cache_hit
+            stats['errors'] += error
+            stats['retries'] += retries
+            stats['bytes'] += nbytes
+            stats['decode_s'] += decode_s
+        logger.debug(json.dumps({
+            'endpoint': endpoint, 'latency_ms': round(latency * 1000, 2),
+            'bytes': nbytes, 'decode_ms': round(decode_s * 1000, 2),
+            'cache_hit': cache_hit, 'retries': retries, 'error': error,
+        }))
+
+    @contextmanager
+    def timed(self, section):
+        """Mide el tiempo de un bloque (p. ej. una sección del dashboard)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_section(section, time.perf_counter() - start)
+
+    def stopwatch(self):
+        """Cronómetro para secciones consecutivas: cada lap(section)
+        registra el tiempo transcurrido desde el lap anterior"""
+        return Stopwatch(self)
+
+    def record_section(self, section, elapsed):
+        with self.lock:
+            self.sections[section].append(elapsed)
+
+    def endpoint_summary(self):
+        """Resumen por endpoint con percentiles de latencia en ms"""
+        with self.lock:
+            rows = [
+                {
+                    'endpoint': endpoint,
+                    'requests': stats['requests'],
+                    'cache_hits': stats['cache_hits'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'kb': round(stats['bytes'] / 1024, 1),
+                    'decode_ms': round(stats['decode_s'] * 1000, 1),
+                    **self._percentiles(stats['latencies']),
+                }
+                for endpoint, stats in self.endpoints.items()
+            ]
+        return pd.DataFrame(rows)
+
+    def section_summary(self):
+        """Resumen por sección con percentiles de tiempo en ms"""
+        with self.lock:
+            rows = [
+                {'section': section, 'runs': len(times), 'last_ms': round(times[-1] * 1000, 1),
+                 **self._percentiles(times)}
+                for section, times in self.sections.items()
+            ]
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def _percentiles(samples):
+        p50, p90, p99 = np.percentile(np.fromiter(samples, float), [50, 90, 99]) * 1000
+        return {'p50_ms': round(p50, 1), 'p90_ms': round(p90, 1), 'p99_ms': round(p99, 1)}
+
+class Stopwatch:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.last = time.perf_counter()
+
+    def lap(self, section):
+        now = time.perf_counter()
+        self.metrics.record_section(section, now - self.last)
+        self.last = now
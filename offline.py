@@ -0,0 +1,95 @@
+"""Liga offline cargada a mano
+
+Datos de la liga introducidos manualmente (sin la API de la FPL), con las
+mismas tablas que construye FPLData: la tabla manager-gameweek y las de
+alineaciones y transferencias, aquí vacías. Los wildcards se unen una sola vez como la
+columna wildcard_used, así que el dashboard los trata igual que los de una
+liga descargada.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from fpl_data import LIVE_DTYPES, MANAGER_DTYPES, PICK_DTYPES, TRANSFER_DTYPES
+from refresher import Snapshot
+
+OFFLINE_LEAGUE = "offline"  # Id de la liga offline en FPL_LEAGUE_IDS
+OFFLINE_NAME = "Liga offline"
+
+# Puntos por jornada
+data = {
+    'TEAM': ['FPLcolombia', 'Ben', 'AtlNacional', 'terror de las enanas', 'SamChelsea',
+            'Falso 9', 'Aston Birras', 'Arsenal Giraldo', 'Terreneitor', 'team1',
+            'JD team', 'Batipibe', 'JMfc'],
+    'MANAGER': ['CHRISTIAN POSSO', 'JUAN ESTEBAN RIVERA', 'ARLEN GUARIN', 'ANDRES RINCON',
+               'SAMUEL SUESCA', 'NICOLAS MANCERA', 'DANIEL MARQUEZ', 'SEBASTIAN GIRALDO',
+               'SANTIAGO VELASQUEZ', 'GABRIEL SUAREZ', 'DIEGO MONTOYA', 'BRAYAN PINEDA',
+               'JAIRO MONTOYA'],
+    'GW1': [81, 67, 69, 72, 39, 67, 62, 71, 66, 47, 47, 64, 66],
+    'GW2': [86, 74, 83, 58, 72, 83, 80, 55, 70, 86, 43, 73, 60],
+    'GW3': [84, 78, 95, 67, 41, 71, 76, 75, 91, 54, 55, 64, 56],
+    'GW4': [54, 59, 60, 57, 27, 64, 52, 38, 33, 65, 59, 52, 38],
+    'GW5': [61, 70, 67, 52, 81, 75, 55, 50, 73, 54, 69, 48, 55],
+    'GW6': [47, 30, 32, 85, 68, 25, 31, 44, 54, 65, 47, 41, 64],
+    'GW7': [48, 40, 56, 39, 60, 43, 27, 44, 40, 39, 43, 39, 26],
+    'GW8': [46, 45, 29, 34, 42, 18, 41, 55, 24, 32, 48, 30, 31],
+    'GW9': [52, 62, 53, 60, 85, 54, 73, 57, 46, 40, 54, 60, 69],
+    'GW10': [22, 40, 22, 29, 47, 27, 39, 32, 24, 15, 28, 37, 30]
+}
+
+# Wildcards
+wildcards = {
+    'TEAM': ['Ben', 'terror de las enanas','Arsenal Giraldo','FPLcolombia','JMfc'],
+    'Gameweek': ['GW6', 'GW3','GW9','GW6','GW6']
+}
+
+# Puntos perdidos por jornada (15 puntos en GW10 para todos)
+lost_points = {10: 15}
+
+def load_offline_league():
+    """Tablas (df, picks) de la liga offline"""
+    wide = pd.DataFrame(data)
+    teams, managers = wide['TEAM'].to_numpy(), wide['MANAGER'].to_numpy()
+    points = wide.filter(regex=r'^GW\d+$')
+    gameweeks = points.columns.str[2:].astype(int).to_numpy()
+    n_teams, n_gameweeks = points.shape
+
+    # Formato largo: una fila por equipo y jornada
+    df = pd.DataFrame({
+        'manager_id': np.tile(np.arange(1, n_teams + 1), n_gameweeks),
+        'manager_name': np.tile(managers, n_gameweeks),
+        'team_name': np.tile(teams, n_gameweeks),
+        'gameweek': np.repeat(gameweeks, n_teams),
+        'gameweek_points': points.to_numpy().T.ravel(),
+    })
+    df['transfers'] = 0
+    df['transfer_cost'] = df['gameweek'].map(lost_points).fillna(0).astype(int)
+    df['total_points'] = (df['gameweek_points'] - df['transfer_cost']).groupby(df['manager_id']).cumsum()
+    df['bank'] = 0
+    df['team_value'] = 0
+
+    # Wildcards como columna precalculada: un único join por (equipo, jornada)
+    wildcards_df = pd.DataFrame(wildcards)
+    wildcards_df['gameweek'] = wildcards_df['Gameweek'].str[2:].astype(int)
+    wildcards_df['wildcard_used'] = True
+    df = df.merge(
+        wildcards_df[['TEAM', 'gameweek', 'wildcard_used']].rename(columns={'TEAM': 'team_name'}),
+        on=['team_name', 'gameweek'], how='left'
+    )
+    df['wildcard_used'] = df['wildcard_used'].notna()
+    df['overall_rank'] = pd.NA
+    df['rank'] = pd.NA
+    # Mismo orden que FPLData: por equipo y, dentro, por jornada
+    df = df.sort_values(['manager_id', 'gameweek'], ignore_index=True).astype(MANAGER_DTYPES)
+
+    # Sin alineaciones: tabla vacía con las columnas y tipos de FPLData
+    dtypes = {**PICK_DTYPES, **LIVE_DTYPES}
+    picks = pd.DataFrame(columns=list(dtypes)).astype(dtypes)
+    return df, picks
+
+def offline_snapshot():
+    """La liga offline como snapshot fijo (versión 1)"""
+    df, picks = load_offline_league()
+    transfers = pd.DataFrame(columns=list(TRANSFER_DTYPES)).astype(TRANSFER_DTYPES)
+    return Snapshot(1, time.time(), df, picks, transfers)
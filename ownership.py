@@ -0,0 +1,146 @@
+"""Ownership, ownership efectivo (EO) y diferenciales dentro de la liga
+
+Ownership convierte la tabla larga de picks en matrices dispersas (SciPy
+CSR) managers × (gameweek, jugador), alineadas por filas con el LeagueCube:
+una con la presencia de cada jugador en la plantilla y otra con su
+multiplicador (capitán x2/x3, banquillo x0). Las columnas van por bloques
+de jornada, así que un rango de jornadas es un rango contiguo de columnas.
+
+Con ellas, sobre las mismas vistas del cubo:
+
+- el ownership y el EO de cada jugador por jornada son sumas por columna;
+- el solapamiento de plantillas entre pares de managers es el producto
+  A · Aᵀ, que se mantiene disperso y se recorre por bloques de filas;
+- los puntos ganados frente a la liga son multiplicadores · puntos menos
+  el EO · puntos de cada jornada jugada.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DIFFERENTIAL_OWNERSHIP = 0.1  # Ownership en la liga por debajo del cual un jugador es diferencial
+SIMILARITY_BLOCK = 512        # Managers por bloque del producto de plantillas
+
+class Ownership:
+    """Matrices de picks dispersas de una liga"""
+    def __init__(self, picks, manager_ids, gameweeks):
+        self.gameweeks = gameweeks
+        rows = pd.Index(manager_ids).get_indexer(picks['manager_id'])
+        gws = np.searchsorted(gameweeks, picks['gameweek'].to_numpy())
+        valid = (rows >= 0) & (gws < len(gameweeks))
+        valid[valid] = gameweeks[gws[valid]] == picks['gameweek'].to_numpy()[valid]
+        picks, rows, gws = picks[valid], rows[valid], gws[valid]
+
+        players, self.player_ids = pd.factorize(picks['player_id'], sort=True)
+        self.players = len(self.player_ids)
+        names = picks.drop_duplicates('player_id').set_index('player_id')
+        self.player_names = names['player_name'].reindex(self.player_ids).astype(str).to_numpy()
+        self.player_teams = names['player_team'].reindex(self.player_ids).astype(str).to_numpy()
+
+        shape = (len(manager_ids), len(gameweeks) * self.players)
+        cols = gws * self.players + players
+        multiplier = picks['multiplier'].to_numpy().astype(np.float32)
+        self.squad = sparse.csr_matrix((np.ones(len(cols), dtype=np.float32), (rows, cols)), shape=shape)
+        self.multiplier = sparse.csr_matrix((multiplier, (rows, cols)), shape=shape)
+        self.multiplier.eliminate_zeros()
+        captain = picks['is_captain'].to_numpy()
+        self.captain = sparse.csr_matrix((multiplier[captain], (rows[captain], cols[captain])), shape=shape)
+        # Puntos de cada jugador en cada jornada (columnas de las matrices)
+        self.points = np.zeros(shape[1], dtype=np.float32)
+        self.points[cols] = picks['player_points'].to_numpy()
+        # Managers con alineación en cada jornada
+        self.active = np.zeros((len(manager_ids), len(gameweeks)), dtype=bool)
+        self.active[rows, gws] = True
+
+    def _slice(self, matrix, view):
+        return matrix[view.rows][:, view.lo * self.players:view.hi * self.players]
+
+    def _per_gameweek(self, matrix, view):
+        """Suma por columna de una matriz, como gameweeks × jugadores"""
+        return np.asarray(self._slice(matrix, view).sum(axis=0)).reshape(-1, self.players)
+
+    def effective_ownership(self, view):
+        """Ownership, EO y EO de capitán de cada jugador elegido en cada
+        jornada de la vista (fracciones de los managers con alineación)"""
+        managers = self.active[view.rows, view.lo:view.hi].sum(axis=0)[:, None]
+        managers = np.maximum(managers, 1)
+        owned = self._per_gameweek(self.squad, view)
+        gws, players = np.nonzero(owned)
+        return pd.DataFrame({
+            'gameweek': view.gameweeks[gws],
+            'player_name': self.player_names[players],
+            'player_team': self.player_teams[players],
+            'ownership': (owned / managers)[gws, players],
+            'eo': (self._per_gameweek(self.multiplier, view) / managers)[gws, players],
+            'captain_eo': (self._per_gameweek(self.captain, view) / managers)[gws, players],
+            'player_points': self.points.reshape(-1, self.players)[view.lo:view.hi][gws, players],
+        })
+
+    def similarity(self, view, limit=None):
+        """Fracción de la plantilla compartida por cada par de los limit
+        primeros managers de la vista (coseno entre sus filas de la matriz de
+        plantillas), como matriz densa para el mapa de calor"""
+        squad = self._slice(self.squad, view)[:limit]
+        shared = (squad @ squad.T).toarray()
+        size = np.sqrt(np.diag(shared))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            overlap = np.nan_to_num(shared / np.outer(size, size))
+        names = view.team_names[:limit]
+        return pd.DataFrame(overlap, index=names, columns=names)
+
+    def similar_pairs(self, view, n=10):
+        """Los n pares de equipos de la vista con más plantilla compartida
+
+        El producto se hace por bloques de SIMILARITY_BLOCK filas, cada uno
+        solo contra los managers desde el bloque en adelante (el triángulo
+        superior, cada par una vez), sin pasar a denso; de cada bloque se
+        guardan solo sus n mejores pares.
+        """
+        squad = self._slice(self.squad, view)
+        size = np.sqrt(np.asarray(squad.sum(axis=1)).ravel())
+        rows, cols, overlap = [], [], []
+        for start in range(0, squad.shape[0], SIMILARITY_BLOCK):
+            block = squad[start:start + SIMILARITY_BLOCK]
+            shared = (block @ squad[start:].T).tocoo()
+            upper = shared.col > shared.row
+            row, col = start + shared.row[upper], start + shared.col[upper]
+            values = shared.data[upper] / (size[row] * size[col])
+            best = np.argpartition(-values, n)[:n] if len(values) > n else slice(None)
+            rows.append(row[best])
+            cols.append(col[best])
+            overlap.append(values[best])
+        rows, cols, overlap = (np.concatenate(parts) for parts in (rows, cols, overlap))
+        # De más a menos solapamiento; los empates, en el orden de la clasificación
+        best = np.lexsort((cols, rows, -overlap))[:n]
+        return pd.DataFrame({
+            'team_a': view.team_names[rows[best]],
+            'team_b': view.team_names[cols[best]],
+            'overlap': overlap[best],
+        })
+
+    def differentials(self, view):
+        """Por equipo en la vista, de más a menos ganancia:
+
+        - gain_vs_league: puntos ganados frente a la liga, Σ (multiplicador −
+          EO) · puntos en las jornadas jugadas;
+        - differential_points: puntos de jugadores con ownership en la liga
+          menor que DIFFERENTIAL_OWNERSHIP;
+        - template_overlap: ownership medio en la liga de sus jugadores.
+        """
+        squad = self._slice(self.squad, view)
+        multiplier = self._slice(self.multiplier, view)
+        points = self.points[view.lo * self.players:view.hi * self.players]
+        active = self.active[view.rows, view.lo:view.hi]
+        managers = np.maximum(active.sum(axis=0), 1)
+
+        ownership = np.asarray(squad.sum(axis=0)).ravel() / np.repeat(managers, self.players)
+        eo = np.asarray(multiplier.sum(axis=0)).ravel() / np.repeat(managers, self.players)
+        league_points = (eo * points).reshape(-1, self.players).sum(axis=1)
+        differential = np.where(ownership < DIFFERENTIAL_OWNERSHIP, points, 0)
+        picks = np.asarray(squad.sum(axis=1)).ravel()
+        return pd.DataFrame({
+            'team_name': view.team_names,
+            'gain_vs_league': multiplier @ points - active @ league_points,
+            'differential_points': multiplier @ differential,
+            'template_overlap': (squad @ ownership) / np.maximum(picks, 1),
+        }).sort_values(['gain_vs_league', 'team_name'], ascending=[False, True], ignore_index=True)
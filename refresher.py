@@ -0,0 +1,170 @@
+"""Refresco en segundo plano de los datos de una o varias ligas
+
+Un hilo reconstruye periódicamente los datos con FPLData.refresh_leagues y
+publica cada resultado completo como un snapshot inmutable por liga; el
+dashboard siempre lee el último snapshot terminado sin esperar a la red.
+Las ligas se refrescan en orden, así que los managers que comparten solo se
+descargan una vez.
+
+También se puede ejecutar como proceso independiente para mantener caliente
+la caché persistente que comparte con el dashboard:
+
+    python refresher.py 1126029 314 --interval 900
+
+Con snapshot_dir cada snapshot se guarda además en disco (Arrow IPC), y al
+arrancar se parte del último guardado en lugar de recorrer toda la liga.
+
+Con live_interval, mientras haya una gameweek en juego, entre dos refrescos
+completos se publican cada live_interval segundos los puntos provisionales
+de esa jornada (FPLData.refresh_live): una petición por ciclo en lugar de
+recorrer la liga.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from fpl_data import FPLData
+
+logger = logging.getLogger(__name__)
+
+Snapshot = namedtuple(
+    'Snapshot', ['version', 'built_at', 'df', 'picks', 'transfers', 'name'], defaults=[None, None]
+)
+
+class LeagueRefresher(threading.Thread):
+    """Hilo que reconstruye una o varias ligas cada `interval` segundos"""
+    def __init__(self, fpl, league_ids, interval=3600, snapshot_dir=None, live_interval=None):
+        if isinstance(league_ids, (str, int)):
+            league_ids = [league_ids]
+        super().__init__(name=f"refresher-{'-'.join(map(str, league_ids))}", daemon=True)
+        self.fpl = fpl
+        self.league_ids = list(league_ids)
+        self.interval = interval
+        self.snapshot_dir = snapshot_dir
+        self.live_interval = live_interval
+        self.live_gameweek = None
+        self.progress = 0.0
+        self.snapshots = {}
+        self.first_attempt = threading.Event()
+        self.stopped = threading.Event()
+
+    def latest(self, league_id=None):
+        """Último snapshot completo de una liga (por defecto la primera),
+        o None si aún no hay ninguno"""
+        return self.snapshots.get(self.league_ids[0] if league_id is None else league_id)
+
+    def refresh(self):
+        """Reconstruye las ligas y publica cada resultado como nuevo snapshot"""
+        self.progress = 0.0
+        results = self.fpl.refresh_leagues(self.league_ids, progress=self._set_progress)
+        for league_id, result in results.items():
+            self._publish(league_id, result)
+            if self.snapshot_dir:
+                self.fpl.save_snapshot(league_id, self.snapshot_dir)
+        return self.snapshots
+
+    def refresh_live(self):
+        """Publica los puntos provisionales de la gameweek en juego"""
+        self.live_gameweek = self.fpl.live_gameweek()
+        if self.live_gameweek is None:
+            return self.snapshots
+        for league_id in self.league_ids:
+            result = self.fpl.refresh_live(league_id)
+            if result is not None:
+                self._publish(league_id, result)
+        return self.snapshots
+
+    def load_persisted(self):
+        """Publica los últimos snapshots guardados en disco, si existen"""
+        if self.snapshot_dir:
+            for league_id in self.league_ids:
+                try:
+                    result = self.fpl.load_snapshot(league_id, self.snapshot_dir)
+                except Exception:
+                    logger.exception("Error cargando el snapshot de la liga %s", league_id)
+                    continue
+                if result is not None:
+                    self._publish(league_id, result)
+        return self.snapshots
+
+    def _publish(self, league_id, result):
+        df, picks = result
+        transfers = self.fpl.transfers.get(league_id)
+        name = self.fpl.league_names.get(league_id)
+        previous = self.snapshots.get(league_id)
+        version = previous.version + 1 if previous else 1
+        # Asignar la referencia es atómico: los lectores ven el snapshot
+        # anterior o el nuevo, nunca uno a medio construir
+        self.snapshots = {
+            **self.snapshots, league_id: Snapshot(version, time.time(), df, picks, transfers, name)
+        }
+
+    def run(self):
+        if not self.snapshots:
+            self.load_persisted()
+        next_refresh = time.monotonic()
+        while not self.stopped.is_set():
+            if time.monotonic() >= next_refresh:
+                try:
+                    self.refresh()
+                    if self.live_interval:
+                        self.live_gameweek = self.fpl.live_gameweek()
+                except Exception:
+                    logger.exception("Error refrescando las ligas %s", self.league_ids)
+                finally:
+                    self.first_attempt.set()
+                next_refresh = time.monotonic() + self.interval
+            elif self.live_interval:
+                try:
+                    self.refresh_live()
+                except Exception:
+                    logger.exception("Error actualizando en vivo las ligas %s", self.league_ids)
+            wait = next_refresh - time.monotonic()
+            self.stopped.wait(min(wait, self.live_interval) if self.live_interval else wait)
+
+    def stop(self):
+        self.stopped.set()
+
+    def _set_progress(self, fraction):
+        self.progress = fraction
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresca periódicamente los datos de una liga de la FPL")
+    parser.add_argument('league_ids', nargs='+', help="Ids de las ligas clásicas")
+    parser.add_argument('--interval', type=int, default=900, help="Segundos entre refrescos")
+    parser.add_argument('--once', action='store_true', help="Refrescar una sola vez y salir")
+    parser.add_argument(
+        '--cache-path',
+        default=os.environ.get("FPL_CACHE_PATH", ".fpl_cache/http.sqlite"),
+        help="Caché HTTP persistente (la misma que usa el dashboard)"
+    )
+    parser.add_argument(
+        '--snapshot-dir',
+        default=os.environ.get("FPL_SNAPSHOT_DIR", ".fpl_cache/snapshots"),
+        help="Directorio donde se guardan los snapshots Arrow de la liga"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    refresher = LeagueRefresher(
+        FPLData(cache_path=args.cache_path), args.league_ids, args.interval, args.snapshot_dir
+    )
+    refresher.load_persisted()
+    while True:
+        start = time.monotonic()
+        snapshots = refresher.refresh()
+        for league_id, snapshot in snapshots.items():
+            logger.info(
+                "Liga %s: snapshot %d con %d filas",
+                league_id, snapshot.version, len(snapshot.df)
+            )
+        logger.info("Refresco completo en %.1f s", time.monotonic() - start)
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Simulación Monte Carlo del final de temporada de una liga
+
+SeasonSimulator toma del LeagueCube los puntos netos por jornada (puntos
+menos coste de transferencias) y el total actual de cada manager, y simula
+las jornadas restantes remuestreando (bootstrap) los puntos de cada jornada:
+con probabilidad own_weight de la historia del propio manager y si no de la
+de toda la liga.
+
+Como las jornadas se remuestrean de forma independiente, la suma de las
+jornadas restantes tiene como distribución la convolución R veces de la
+distribución de una jornada. Se calcula una vez por manager con FFT y se
+guarda como tabla de cuantiles, de modo que cada temporada simulada cuesta
+un solo sorteo por manager en lugar de uno por jornada. Las temporadas se
+simulan por bloques como matrices temporadas × managers, y los bloques
+pueden repartirse entre procesos.
+
+De cada temporada solo hacen falta los tres primeros y los puestos de
+descenso, que se separan con argpartition sin ordenar toda la liga. Los
+puntos y la posición final esperados no se simulan: salen exactos de las
+tablas de cuantiles, porque los totales de los managers son independientes.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+TOTAL_GAMEWEEKS = 38
+QUANTILES = 1024            # Resolución de la tabla de cuantiles por manager
+CHUNK_CELLS = 4_000_000     # Temporadas × managers por bloque
+FFT_BLOCK = 256             # Managers por lote de FFT (acota la memoria)
+
+def _remaining_quantiles(pmf, remaining, low):
+    """Cuantiles de la suma de `remaining` jornadas, por manager
+
+    pmf es la distribución de una jornada (managers × valores desde low).
+    """
+    width = pmf.shape[1]
+    length = remaining * (width - 1) + 1
+    size = 1 << (length - 1).bit_length()
+    targets = (np.arange(QUANTILES) + 0.5) / QUANTILES
+    table = np.empty((len(pmf), QUANTILES), dtype=np.int32)
+    for start in range(0, len(pmf), FFT_BLOCK):
+        block = pmf[start:start + FFT_BLOCK]
+        dist = np.fft.irfft(np.fft.rfft(block, size, axis=1) ** remaining, size, axis=1)[:, :length]
+        cdf = np.cumsum(np.clip(dist, 0, None), axis=1)
+        cdf /= cdf[:, -1:]
+        # Un searchsorted para todo el lote: cada fila se desplaza a su
+        # propio intervalo [fila, fila + 1]
+        rows = np.arange(len(block))[:, None]
+        index = np.searchsorted((cdf + rows).ravel(), (targets + rows).ravel()).reshape(len(block), -1)
+        table[start:start + FFT_BLOCK] = index - rows * length + remaining * low
+    return table
+
+def _final_keys(table, current):
+    """Puntos finales de cada cuantil convertidos en una clave única por
+    manager: en un empate gana el que va antes en la clasificación actual"""
+    managers = len(current)
+    tiebreak = np.arange(managers - 1, -1, -1)
+    return (current[:, None] + table) * managers + tiebreak[:, None]
+
+def _simulate_chunk(keys, seasons, relegation_spots, seed):
+    """Simula un bloque de temporadas y devuelve, por manager, los
+    recuentos de título, top 3 y descenso"""
+    rng = np.random.default_rng(seed)
+    managers, quantiles = keys.shape
+    counts = np.zeros((3, managers), dtype=np.int64)
+    if managers == 0:
+        return counts
+    draws = rng.integers(0, quantiles, (seasons, managers), dtype=np.int16)
+    keys = keys.ravel().take(draws + np.arange(managers) * quantiles)
+    # La posición 0 de la partición también queda en su sitio: el campeón
+    top = min(3, managers)
+    leaders = np.argpartition(-keys, sorted({0, top - 1}), axis=1)[:, :top]
+    counts[0] = np.bincount(leaders[:, 0], minlength=managers)
+    counts[1] = np.bincount(leaders.ravel(), minlength=managers)
+    if relegation_spots:
+        bottom = np.argpartition(keys, relegation_spots - 1, axis=1)[:, :relegation_spots]
+        counts[2] = np.bincount(bottom.ravel(), minlength=managers)
+    return counts
+
+def _expected_positions(table, current):
+    """Posición final esperada (0 = primero) de cada manager
+
+    El total final de cada manager es current más un cuantil al azar de su
+    tabla, independiente de los demás: la posición esperada es la suma de
+    las probabilidades de que cada rival acabe por delante (en un empate, el
+    que va antes en la clasificación). Se calcula sobre histogramas de los
+    totales, por lotes de FFT_BLOCK managers.
+    """
+    managers, quantiles = table.shape
+    values = current[:, None] + table
+    low = values.min() if managers else 0
+    values = values - low
+    width = int(values.max()) + 1 if managers else 1
+    total = np.bincount(values.ravel(), minlength=width) / quantiles
+    # Managers que acaban con más de t puntos (esperanza)
+    above = np.cumsum(total[::-1])[::-1] - total
+    seen = np.zeros(width)
+    positions = np.empty(managers)
+    for start in range(0, managers, FFT_BLOCK):
+        block = values[start:start + FFT_BLOCK]
+        rows = np.arange(len(block))[:, None]
+        pmf = np.zeros((len(block), width))
+        np.add.at(pmf, (np.broadcast_to(rows, block.shape), block), 1 / quantiles)
+        # Empates con los que van antes en la clasificación
+        before = seen + np.cumsum(pmf, axis=0) - pmf
+        # above incluye al propio manager: P(X > X') de dos copias
+        # independientes es (1 - P(X = X')) / 2
+        own = (1 - (pmf ** 2).sum(axis=1)) / 2
+        positions[start:start + FFT_BLOCK] = above[block].mean(axis=1) - own + before[rows, block].mean(axis=1)
+        seen += pmf.sum(axis=0)
+    return positions
+
+class SeasonSimulator:
+    """Proyección de las posiciones finales de una liga"""
+    def __init__(self, cube, total_gameweeks=TOTAL_GAMEWEEKS, own_weight=0.7):
+        net = (cube.points - cube.cost).astype(np.int64)
+        self.team_names = cube.team_names
+        self.current = np.where(cube.present, cube.total_points, 0).max(axis=1).astype(np.int64)
+        last_gw = int(cube.gameweeks.max()) if len(cube.gameweeks) else total_gameweeks
+        self.remaining = max(total_gameweeks - last_gw, 0)
+        managers = len(self.current)
+        if self.remaining == 0 or not cube.present.any():
+            self.table = np.zeros((managers, 1), dtype=np.int32)
+            return
+
+        # Distribución de una jornada: mezcla de la historia propia y la de
+        # la liga (los managers sin historia usan solo la de la liga)
+        rows, cols = np.nonzero(cube.present)
+        values = net[rows, cols]
+        low = int(values.min())
+        width = int(values.max()) - low + 1
+        own = np.zeros((managers, width))
+        np.add.at(own, (rows, values - low), 1)
+        counts = own.sum(axis=1, keepdims=True)
+        league = own.sum(axis=0) / len(values)
+        weight = np.where(counts > 0, own_weight, 0.0)
+        pmf = weight * own / np.maximum(counts, 1) + (1 - weight) * league
+        self.table = _remaining_quantiles(pmf, self.remaining, low)
+
+    def run(self, seasons=100_000, relegation_spots=3, seed=None, processes=None):
+        """Probabilidades de título, top 3 y descenso de cada equipo
+
+        processes > 1 reparte los bloques de temporadas entre procesos.
+        """
+        managers = len(self.current)
+        relegation_spots = min(relegation_spots, max(managers - 1, 0))
+        per_chunk = max(CHUNK_CELLS // max(managers, 1), 1)
+        keys = _final_keys(self.table, self.current)
+        sizes = [min(per_chunk, seasons - start) for start in range(0, seasons, per_chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        args = [
+            (keys, size, relegation_spots, chunk_seed)
+            for size, chunk_seed in zip(sizes, seeds)
+        ]
+        if processes and processes > 1 and len(sizes) > 1:
+            # spawn y no fork: la simulación corre dentro de Streamlit, con
+            # los hilos del refresco y del servidor activos
+            with ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                counts = sum(executor.map(_simulate_chunk, *zip(*args)))
+        else:
+            counts = sum(_simulate_chunk(*chunk) for chunk in args)
+        title, top3, relegation = counts / seasons
+        return pd.DataFrame({
+            'team_name': self.team_names,
+            'current_points': self.current,
+            'expected_points': self.current + self.table.mean(axis=1),
+            'expected_position': _expected_positions(self.table, self.current) + 1,
+            'p_title': title,
+            'p_top3': top3,
+            'p_relegation': relegation,
+        }).sort_values(['expected_position', 'team_name'], ignore_index=True)
@@ -0,0 +1,141 @@
+"""Pruebas de FPLData contra la API sintética de bench.py, sin red
+
+Las peticiones no salen del proceso: la sesión HTTP se sustituye por una
+que responde con los payloads de FakeFPL.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+import fpl_data
+from bench import LEAGUE_ID, FakeFPL
+from fpl_data import FPLData
+
+class FakeSession:
+    """Sesión que responde con FakeFPL; down(url) simula un 503"""
+    def __init__(self, fake, down=lambda url: False):
+        self.fake = fake
+        self.down = down
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.requests += 1
+        response = requests.Response()
+        response.url = url
+        if self.down(url):
+            response.status_code = 503
+            response._content = b''
+            return response
+        payload = self.fake.route(url)
+        response.status_code = 200 if payload is not None else 404
+        response._content = json.dumps(payload if payload is not None else {}).encode()
+        return response
+
+def make_fpl(fake, down=lambda url: False):
+    fpl = FPLData(requests_per_second=100_000)
+    fpl.session = FakeSession(fake, down)
+    return fpl
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(fpl_data, 'BACKOFF_BASE', 0.001)
+
+def test_league_with_api_down_fails_fast(fast_retries):
+    # Los managers devuelven siempre 503: la pasada de reintentos prueba
+    # una vez tras abrirse el breaker y se rinde, sin sondear para siempre
+    fake = FakeFPL(managers=8, gameweeks=3)
+    fpl = make_fpl(fake, down=lambda url: '/entry/' in url)
+    fpl.breaker.reset_timeout = 0.3
+    warnings = []
+    result = []
+    crawl = threading.Thread(
+        target=lambda: result.append(fpl.process_league_data(LEAGUE_ID, warn=warnings.append)), daemon=True
+    )
+    crawl.start()
+    crawl.join(timeout=10)
+    assert result, "process_league_data no terminó con la API caída"
+    df, picks = result[0]
+    assert df.empty and picks.empty
+    assert len(warnings) == fake.managers
+    requests_made = fpl.session.requests
+    time.sleep(0.5)
+    assert fpl.session.requests == requests_made
+
+def test_deferred_pass_has_a_deadline(fast_retries, monkeypatch):
+    monkeypatch.setattr(fpl_data, 'DEFERRED_TIMEOUT', 0)
+    fake = FakeFPL(managers=4, gameweeks=2)
+    fpl = make_fpl(fake, down=lambda url: '/entry/' in url)
+    warnings = []
+    df, _ = fpl.process_league_data(LEAGUE_ID, warn=warnings.append)
+    assert df.empty
+    assert len(warnings) == fake.managers
+
+class SharedLeagues(FakeFPL):
+    """Dos ligas que comparten managers; extra suma puntos a la última
+    gameweek de cada historial"""
+    members = {1: [0, 1, 2, 3], 2: [2, 3, 4, 5]}
+    extra = 0
+
+    def route(self, url):
+        match = re.search(r'/leagues-classic/(\d+)/standings/', url)
+        if match:
+            members = self.members[int(match.group(1))]
+            return {
+                'league': {'id': int(match.group(1)), 'name': f"Liga {match.group(1)}"},
+                'standings': {'has_next': False, 'page': 1, 'results': [
+                    {'entry': self.entry_id(i), 'player_name': f"Manager {i}", 'entry_name': f"Equipo {i}",
+                     'rank': rank + 1, 'total': 0, 'event_total': 0}
+                    for rank, i in enumerate(members)
+                ]},
+            }
+        return super().route(url)
+
+    def history(self, entry):
+        history = super().history(entry)
+        last = history['current'][-1]
+        last['points'] += self.extra
+        last['total_points'] += self.extra
+        return history
+
+def test_overlapping_leagues_stay_fresh_across_passes():
+    fake = SharedLeagues(managers=6, gameweeks=3)
+    fpl = make_fpl(fake)
+    fpl.refresh_leagues([1, 2])
+    fake.extra = 100
+    results = fpl.refresh_leagues([1, 2])
+    # Igual que una carga completa de cada liga, también en los compartidos
+    for league_id in (1, 2):
+        full = make_fpl(fake)
+        df, picks = full.process_league_data(league_id)
+        pd.testing.assert_frame_equal(results[league_id][0], df)
+        pd.testing.assert_frame_equal(results[league_id][1], picks)
+        pd.testing.assert_frame_equal(fpl.transfers[league_id], full.transfers[league_id])
+
+def test_interrupted_save_keeps_previous_snapshot(tmp_path, monkeypatch):
+    fake = SharedLeagues(managers=6, gameweeks=3)
+    fpl = make_fpl(fake)
+    df, picks = fpl.process_league_data(1)
+    fpl.save_snapshot(1, tmp_path)
+    fake.extra = 100
+    fpl.refresh_league(1)
+    write_arrow = fpl_data._write_arrow
+
+    def fail_on_picks(data, path):
+        if 'picks' in os.path.basename(path):
+            raise OSError("disco lleno")
+        write_arrow(data, path)
+
+    monkeypatch.setattr(fpl_data, '_write_arrow', fail_on_picks)
+    with pytest.raises(OSError):
+        fpl.save_snapshot(1, tmp_path)
+    loaded = FPLData().load_snapshot(1, tmp_path)
+    pd.testing.assert_frame_equal(loaded[0], df)
+    pd.testing.assert_frame_equal(loaded[1], picks)
@@ -0,0 +1,94 @@
+"""Registro de transferencias indexado y rentabilidad de los fichajes
+
+TransferLog ordena el registro de transferencias por (manager, gameweek),
+con las filas alineadas con las matrices del LeagueCube, y guarda un índice
+de desplazamientos (como el de una matriz CSR): las transferencias de la
+celda (manager, gameweek) son un corte contiguo de la tabla, sin filtrar.
+
+La rentabilidad (ROI) de cada fichaje compara los puntos del jugador que
+entra con los del que sale en la jornada del cambio y las horizon - 1
+siguientes. Se calcula para todo el registro a la vez con sumas prefijas
+sobre la matriz de puntos jugadores × gameweeks (FPLData.get_player_points),
+y cuenta los puntos de los jugadores jueguen o no de titulares.
+"""
+import numpy as np
+import pandas as pd
+
+class TransferLog:
+    """Transferencias de una liga indexadas por (manager, gameweek)"""
+    def __init__(self, transfers, manager_ids, gameweeks):
+        self.manager_ids = np.asarray(manager_ids)
+        self.gameweeks = gameweeks
+        rows = pd.Index(manager_ids).get_indexer(transfers['manager_id'])
+        cols = np.searchsorted(gameweeks, transfers['gameweek'].to_numpy())
+        valid = (rows >= 0) & (cols < len(gameweeks))
+        valid[valid] = gameweeks[cols[valid]] == transfers['gameweek'].to_numpy()[valid]
+        rows, cols = rows[valid], cols[valid]
+        order = np.lexsort((cols, rows))
+        self.table = transfers[valid].iloc[order].reset_index(drop=True)
+        self.rows, self.cols = rows[order], cols[order]
+        cells = len(manager_ids) * len(gameweeks)
+        self.offsets = np.searchsorted(self.rows * len(gameweeks) + self.cols, np.arange(cells + 1))
+        # Transferencias por celda, como matriz managers × gameweeks
+        self.counts = np.diff(self.offsets).reshape(len(manager_ids), len(gameweeks))
+
+    def lookup(self, manager_id, gameweek):
+        """Transferencias de un manager en una gameweek"""
+        row = np.flatnonzero(self.manager_ids == manager_id)
+        col = np.searchsorted(self.gameweeks, gameweek)
+        if len(row) == 0 or col >= len(self.gameweeks) or self.gameweeks[col] != gameweek:
+            return self.table.iloc[:0]
+        cell = row[0] * len(self.gameweeks) + col
+        return self.table.iloc[self.offsets[cell]:self.offsets[cell + 1]]
+
+    def roi(self, points, horizon):
+        """Puntos del que entra, del que sale y su diferencia para cada
+        transferencia del registro, en las horizon jornadas desde el cambio
+
+        points es la matriz jugadores × gameweeks de FPLData.get_player_points
+        con las mismas gameweeks que el registro.
+        """
+        prefix = np.zeros((len(points), points.shape[1] + 1), dtype=np.int32)
+        np.cumsum(points, axis=1, out=prefix[:, 1:])
+        start = self.cols
+        end = np.minimum(start + horizon, points.shape[1])
+
+        def window(players):
+            players = players.to_numpy().astype(np.intp)
+            inside = players < len(points)
+            players = np.where(inside, players, 0)
+            return np.where(inside, prefix[players, end] - prefix[players, start], 0)
+
+        points_in = window(self.table['player_in'])
+        points_out = window(self.table['player_out'])
+        return points_in, points_out, points_in - points_out
+
+    def summary(self, view, points, horizon):
+        """Por equipo en una vista del cubo, de más a menos rentable: número
+        de transferencias, puntos de los que entraron y de los que salieron,
+        su diferencia, puntos pagados por transferencias extra, ROI neto
+        (diferencia menos coste) y jornadas con coste en que el cambio
+        rindió más de lo que costó"""
+        cube = view.cube
+        points_in, points_out, gain = self.roi(points, horizon)
+        shape = self.counts.shape
+
+        def per_cell(values):
+            matrix = np.zeros(shape, dtype=np.int64)
+            np.add.at(matrix, (self.rows, self.cols), values)
+            return matrix
+
+        gain_matrix = per_cell(gain)
+        paid_off = (cube.cost > 0) & (gain_matrix > cube.cost)
+        cost = view.sum(cube.cost)
+        roi = view.sum(gain_matrix)
+        return pd.DataFrame({
+            'team_name': view.team_names,
+            'transfers': view.sum(self.counts),
+            'points_in': view.sum(per_cell(points_in)),
+            'points_out': view.sum(per_cell(points_out)),
+            'roi': roi,
+            'hits_cost': cost,
+            'net_roi': roi - cost,
+            'hits_paid_off': view.sum(paid_off),
+        }).sort_values(['net_roi', 'team_name'], ascending=[False, True], ignore_index=True)